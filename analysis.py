@@ -0,0 +1,138 @@
+import argparse
+import sys
+
+from classes import PAGE_SIZE
+from engine import load_trace, write_results
+
+
+class Fenwick:
+    # binary indexed tree over access positions, prefix sums in O(log n)
+    def __init__(self, size):
+        self.size = size
+        self.tree = [0] * (size + 1)
+
+    def add(self, i, delta):
+        i += 1
+        tree = self.tree
+        size = self.size
+        while i <= size:
+            tree[i] += delta
+            i += i & -i
+
+    def prefix(self, i):
+        # sum of positions [0, i)
+        total = 0
+        tree = self.tree
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+
+def stack_distances(pages, max_distance, capacity=1 << 16):
+    # histogram of LRU stack distances in one pass over a page stream.
+    # hist[d] counts re-references with d distinct pages in between, hist[max_distance]
+    # collects everything farther; cold misses are counted separately.
+    hist = [0] * (max_distance + 1)
+    cold = 0
+    last = {}  # page: position of its most recent access
+    tree = Fenwick(capacity)
+    pos = 0
+
+    for page in pages:
+        if pos == tree.size:
+            # renumber the live positions (one per distinct page) into a fresh tree
+            order = sorted(last, key=last.get)
+            tree = Fenwick(max(capacity, 2 * len(order)))
+            for i, p in enumerate(order):
+                last[p] = i
+                tree.add(i, 1)
+            pos = len(order)
+
+        prev = last.get(page)
+        if prev is None:
+            cold += 1
+        else:
+            distance = len(last) - tree.prefix(prev + 1)
+            hist[min(distance, max_distance)] += 1
+            tree.add(prev, -1)
+
+        tree.add(pos, 1)
+        last[page] = pos
+        pos += 1
+
+    return hist, cold
+
+
+def miss_curve(hist, cold, max_size):
+    # curve[c] = misses of an LRU cache with c entries, for c in 0..max_size
+    curve = [0] * (max_size + 1)
+    misses = cold + hist[-1]
+    for size in range(len(hist) - 1, -1, -1):
+        if size <= max_size:
+            curve[size] = misses
+        if size > 0:
+            misses += hist[size - 1]
+    return curve
+
+
+def analyze(trace, max_frames, max_tlb=0):
+    # LRU page faults for every frame count 1..max_frames and LRU TLB misses for every
+    # TLB size 1..max_tlb, from a single pass. The TLB curve assumes a fully associative
+    # TLB whose entries stay resident (tlb_size <= frames).
+    limit = max(max_frames, max_tlb)
+    hist, cold = stack_distances((addr // PAGE_SIZE for _, addr in trace), limit)
+    accesses = sum(hist) + cold
+    curve = miss_curve(hist, cold, limit)
+    return {
+        "accesses": accesses,
+        "frames": curve[:max_frames + 1],
+        "tlb": curve[:max_tlb + 1],
+    }
+
+
+def curve_rows(result):
+    rows = []
+    accesses = result["accesses"]
+    for kind in ("frames", "tlb"):
+        for size, misses in enumerate(result[kind]):
+            if size == 0:
+                continue
+            rows.append({
+                "kind": kind,
+                "size": size,
+                "misses": misses,
+                "miss_rate": misses / accesses if accesses else 0.0,
+            })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LRU miss-ratio curves from one pass over a trace.")
+    parser.add_argument("trace")
+    parser.add_argument("-f", "--max-frames", type=int, default=64)
+    parser.add_argument("-t", "--max-tlb", type=int, default=0)
+    parser.add_argument("--format", choices=["json", "csv"], default="csv")
+    parser.add_argument("-o", "--output", default=None)
+    args = parser.parse_args(argv)
+
+    try:
+        result = analyze(load_trace(args.trace), args.max_frames, args.max_tlb)
+    except (OSError, ValueError) as e:
+        print(f"Error: could not load trace file {args.trace}: {e}", file=sys.stderr)
+        return 1
+
+    rows = curve_rows(result)
+    if not rows:
+        print("Error: nothing to report, raise --max-frames or --max-tlb", file=sys.stderr)
+        return 2
+    if args.output:
+        with open(args.output, "w", newline="") as out:
+            write_results(rows, out, args.format)
+    else:
+        write_results(rows, sys.stdout, args.format)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from itertools import accumulate, product
+
+from classes import PAGE_SIZE
+from engine import ALGORITHMS, make_algorithm, make_memory, write_results
+from sweep import parse_sizes
+
+WRITE_RATIO = 0.25
+
+
+# Workload generators: (op, logical address) lists over `pages` distinct pages,
+# reproducible for a given seed. The trace is built before the clock starts.
+
+def with_ops(page_stream, rng):
+    return [("W" if rng.random() < WRITE_RATIO else "R", page * PAGE_SIZE) for page in page_stream]
+
+
+def sequential(n, pages, rng):
+    # repeated linear scans over all pages
+    return with_ops((i % pages for i in range(n)), rng)
+
+
+def looping(n, pages, rng):
+    # loop over a working set of a quarter of the pages
+    working_set = max(1, pages // 4)
+    return with_ops((i % working_set for i in range(n)), rng)
+
+
+def zipfian(n, pages, rng, skew=1.0):
+    weights = list(accumulate(1 / (rank + 1) ** skew for rank in range(pages)))
+    order = list(range(pages))
+    rng.shuffle(order)  # popular pages spread over the address space
+    return with_ops((order[i] for i in rng.choices(range(pages), cum_weights=weights, k=n)), rng)
+
+
+def uniform(n, pages, rng):
+    return with_ops((rng.randrange(pages) for _ in range(n)), rng)
+
+
+def phases(n, pages, rng, num_phases=8):
+    # each phase uses its own working set, an eighth of the pages
+    working_set = max(1, pages // 8)
+    length = max(1, n // num_phases)
+    stream = []
+    while len(stream) < n:
+        base = rng.randrange(pages - working_set + 1)
+        stream.extend(base + rng.randrange(working_set) for _ in range(min(length, n - len(stream))))
+    return with_ops(stream, rng)
+
+
+WORKLOADS = {
+    "sequential": sequential,
+    "loop": looping,
+    "zipf": zipfian,
+    "uniform": uniform,
+    "phases": phases,
+}
+
+
+def run(trace, name, frames, tlb_size):
+    vm = make_memory(make_algorithm(name, frames, trace), frames, tlb_size=tlb_size)
+    access = vm.access
+    start = time.perf_counter_ns()
+    for op, logical_address in trace:
+        access(logical_address // PAGE_SIZE, op)
+    return time.perf_counter_ns() - start, vm
+
+
+def peak_memory(trace, name, frames, tlb_size):
+    # bytes allocated by the simulator (algorithm included) at its peak, trace excluded
+    tracemalloc.start()
+    try:
+        run(trace, name, frames, tlb_size)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark(workloads, algorithms, frame_counts, tlb_sizes, accesses=100_000, footprint=2,
+              repeat=3, seed=1, memory=True, progress=None):
+    # one row per workload x algorithm x frames x TLB size; the workload spans
+    # footprint * frames pages, ns/access is the best of `repeat` timed runs
+    rows = []
+    for workload, frames in product(workloads, frame_counts):
+        trace = WORKLOADS[workload](accesses, footprint * frames, random.Random(seed))
+        for name, tlb_size in product(algorithms, tlb_sizes):
+            best = None
+            for _ in range(repeat):
+                elapsed, vm = run(trace, name, frames, tlb_size)
+                best = elapsed if best is None else min(best, elapsed)
+            row = {
+                "workload": workload,
+                "algorithm": name,
+                "frames": frames,
+                "tlb_size": tlb_size,
+                "accesses": accesses,
+                "page_faults": vm.page_faults,
+                "ns_per_access": best / accesses,
+                "peak_bytes": peak_memory(trace, name, frames, tlb_size) if memory else None,
+            }
+            rows.append(row)
+            if progress:
+                progress(row)
+    return rows
+
+
+def row_key(row):
+    return row["workload"], row["algorithm"], row["frames"], row["tlb_size"]
+
+
+def compare(rows, baseline, threshold=0.10):
+    # (row, metric, old, new) for every metric more than threshold worse than the baseline
+    previous = {row_key(row): row for row in baseline}
+    regressions = []
+    for row in rows:
+        old = previous.get(row_key(row))
+        if old is None:
+            continue
+        for metric in ("ns_per_access", "peak_bytes"):
+            if old.get(metric) and row.get(metric) and row[metric] > old[metric] * (1 + threshold):
+                regressions.append((row, metric, old[metric], row[metric]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time VirtualMemory.access on synthetic workloads.")
+    parser.add_argument("-W", "--workloads", default=",".join(WORKLOADS))
+    parser.add_argument("-a", "--algorithms", default=",".join(ALGORITHMS))
+    parser.add_argument("-f", "--frames", default="8,64,512,4096,65536", help='e.g. "8-65536x8"')
+    parser.add_argument("-t", "--tlb-sizes", default="4,64")
+    parser.add_argument("-n", "--accesses", type=int, default=100_000)
+    parser.add_argument("--footprint", type=int, default=2, help="workload pages per frame")
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak-memory run")
+    parser.add_argument("-o", "--output", default=None, help="save results as JSON")
+    parser.add_argument("--baseline", default=None, help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before failing (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    workloads = args.workloads.split(",")
+    algorithms = args.algorithms.split(",")
+    for name in workloads:
+        if name not in WORKLOADS:
+            print(f"Error: unknown workload {name}", file=sys.stderr)
+            return 2
+    for name in algorithms:
+        if name not in ALGORITHMS:
+            print(f"Error: unknown algorithm {name}", file=sys.stderr)
+            return 2
+    try:
+        frame_counts = parse_sizes(args.frames)
+        tlb_sizes = parse_sizes(args.tlb_sizes)
+    except ValueError:
+        print("Error: invalid size list", file=sys.stderr)
+        return 2
+
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error: could not load baseline {args.baseline}: {e}", file=sys.stderr)
+            return 1
+
+    def progress(row):
+        memory = "" if row["peak_bytes"] is None else f"  {row['peak_bytes'] / 1024:10.1f} KiB"
+        print(f"{row['workload']:>10} {row['algorithm']:>12} frames={row['frames']:<6} tlb={row['tlb_size']:<4} "
+              f"{row['ns_per_access']:8.1f} ns/access{memory}", file=sys.stderr)
+
+    rows = benchmark(
+        workloads, algorithms, frame_counts, tlb_sizes, args.accesses, args.footprint,
+        args.repeat, args.seed, not args.no_memory, progress
+    )
+    if args.output:
+        with open(args.output, "w") as out:
+            write_results(rows, out, "json")
+
+    if baseline is None:
+        return 0
+    regressions = compare(rows, baseline, args.threshold)
+    for row, metric, old, new in regressions:
+        print(f"REGRESSION {row['workload']}/{row['algorithm']} frames={row['frames']} tlb={row['tlb_size']}: "
+              f"{metric} {old:.1f} -> {new:.1f} ({(new / old - 1) * 100:+.1f}%)", file=sys.stderr)
+    print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+import mmap
+import struct
+import sys
+from array import array
+
+from classes import iter_trace, PAGE_SIZE
+
+# Binary trace layout (little-endian):
+#   header  8-byte magic, uint32 version, uint32 flags
+#   body    one uint64 per access, bit 63 set for writes, bits 0..62 the logical address.
+#           With FLAG_PID, bits 48..62 hold the process id and bits 0..47 the address
+MAGIC = b"VMTRACE\0"
+VERSION = 1
+HEADER = struct.Struct("<8sII")
+HEADER_SIZE = HEADER.size
+WRITE_BIT = 1 << 63
+ADDRESS_MASK = WRITE_BIT - 1
+FLAG_PID = 1
+PID_SHIFT = 48
+PID_ADDRESS_MASK = (1 << PID_SHIFT) - 1
+MAX_PID = (1 << (63 - PID_SHIFT)) - 1
+
+
+def encode(op, logical_address, pid=None):
+    if pid is not None:
+        if logical_address > PID_ADDRESS_MASK or not 0 <= pid <= MAX_PID:
+            raise ValueError(f"access ({logical_address}, pid {pid}) does not fit a 48-bit address / 15-bit pid")
+        logical_address |= pid << PID_SHIFT
+    if op == "W":
+        return logical_address | WRITE_BIT
+    return logical_address
+
+
+def is_binary_trace(filename):
+    try:
+        with open(filename, "rb") as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def write_binary_trace(filename, trace, chunk_size=65536, with_pid=False):
+    # trace is any iterable of (op, logical_address), or (op, logical_address, pid) with
+    # with_pid; returns the number of accesses written
+    count = 0
+    with open(filename, "wb") as out:
+        out.write(HEADER.pack(MAGIC, VERSION, FLAG_PID if with_pid else 0))
+        words = array("Q")
+        for access in trace:
+            words.append(encode(*access))
+            if len(words) >= chunk_size:
+                count += flush_words(out, words)
+                words = array("Q")
+        count += flush_words(out, words)
+    return count
+
+
+def flush_words(out, words):
+    if sys.byteorder != "little":
+        words.byteswap()
+    words.tofile(out)
+    return len(words)
+
+
+def convert_text_trace(src, dst, with_pid=False):
+    return write_binary_trace(dst, iter_trace(src, with_pid), with_pid=with_pid)
+
+
+class BinaryTrace:
+    # memory-mapped binary trace, iterable any number of times without re-parsing.
+    # Iterates (op, logical_address), or (op, logical_address, pid) with with_pid
+    def __init__(self, filename, with_pid=False):
+        self.filename = filename
+        self.with_pid = with_pid
+        self.file = open(filename, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, flags = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{filename} is not a version {VERSION} binary trace")
+        self.has_pid = bool(flags & FLAG_PID)
+        self.address_mask = PID_ADDRESS_MASK if self.has_pid else ADDRESS_MASK
+
+        if sys.byteorder == "little":
+            self.words = memoryview(self.map)[HEADER_SIZE:].cast("Q")
+        else:
+            self.words = array("Q", self.map[HEADER_SIZE:])
+            self.words.byteswap()
+
+    def __len__(self):
+        return len(self.words)
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    def iter_from(self, start):
+        # the accesses from index start on, without reading the ones before
+        mask = self.address_mask
+        words = self.words[start:] if start else self.words
+        if self.with_pid:
+            for word in words:
+                yield ("W" if word & WRITE_BIT else "R", word & mask, (word & ADDRESS_MASK) >> PID_SHIFT if self.has_pid else 0)
+        else:
+            for word in words:
+                yield ("W" if word & WRITE_BIT else "R", word & mask)
+
+    def pages(self):
+        mask = self.address_mask
+        for word in self.words:
+            yield (word & mask) // PAGE_SIZE
+
+    def as_numpy(self):
+        # zero-copy view of the packed words
+        import numpy as np
+        return np.frombuffer(self.map, dtype="<u8", offset=HEADER_SIZE)
+
+    def close(self):
+        if isinstance(getattr(self, "words", None), memoryview):
+            self.words.release()
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getstate__(self):
+        # reopen the mapping in the receiving process instead of copying it
+        return self.filename, self.with_pid
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if a != "--pid"]
+    if len(args) != 2:
+        print("usage: python -m bintrace [--pid] <text trace> <binary trace>", file=sys.stderr)
+        sys.exit(2)
+    n = convert_text_trace(args[0], args[1], "--pid" in sys.argv[1:])
+    print(f"Wrote {n} accesses to {args[1]}")
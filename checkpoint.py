@@ -0,0 +1,23 @@
+import gzip
+import os
+import pickle
+
+CHECKPOINT_VERSION = 1
+
+
+def save_checkpoint(filename, state):
+    # state is a dict of picklable objects (the simulator, its sinks, the trace offset).
+    # It is written next to the target and renamed over it, so a crash while saving
+    # leaves the previous checkpoint intact
+    tmp = filename + ".tmp"
+    with gzip.open(tmp, "wb", compresslevel=1) as out:
+        pickle.dump(dict(state, version=CHECKPOINT_VERSION), out, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, filename)
+
+
+def load_checkpoint(filename):
+    with gzip.open(filename, "rb") as file:
+        state = pickle.load(file)
+    if not isinstance(state, dict) or state.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"{filename} is not a version {CHECKPOINT_VERSION} checkpoint")
+    return state
@@ -1,65 +1,507 @@
+import bz2
+import gzip
+import lzma
+import sys
+from array import array
+from collections import OrderedDict, deque
+from heapq import heapify, heappop, heappush
+from itertools import islice
+
 PAGE_SIZE = 4096
+# event codes passed to the sinks attached with VirtualMemory.attach
+TLB_HIT, TLB_MISS, PT_HIT, FAULT, EVICTION, WRITEBACK, TLB_INVALIDATION = range(7)
+EVENT_NAMES = ["tlb_hit", "tlb_miss", "pt_hit", "fault", "eviction", "writeback", "tlb_invalidation"]
+ASID_SHIFT = 52  # pages of process pid are tracked as (pid << ASID_SHIFT) | page
+PAGE_MASK = (1 << ASID_SHIFT) - 1
 
 class TLB:
-    def __init__(self, size=4):
+    def __init__(self, size=4, ways=None):
+        # ways=None gives a fully associative TLB, otherwise size // ways sets
+        if size < 1 or (ways is not None and ways < 1):
+            raise ValueError("TLB size and ways must be at least 1")
+        if ways is None or ways >= size:
+            ways = size
+        elif size % ways:
+            raise ValueError(f"TLB size {size} is not a multiple of its {ways} ways")
         self.size = size
-        self.entries = []  # list of (page, frame)
+        self.ways = ways
+        self.num_sets = size // ways
+        self.sets = [OrderedDict() for _ in range(self.num_sets)]  # page: frame, LRU first
+
+    @property
+    def entries(self):
+        # list of (page, frame), most recently used first
+        pairs = []
+        for s in self.sets:
+            pairs.extend(reversed(s.items()))
+        return pairs
 
     def lookup(self, page):
-        for i, (p, f) in enumerate(self.entries):
-            if p == page:
-                # move to front (most recently used)
-                self.entries.pop(i)
-                self.entries.insert(0, (p, f))
-                return f
-        return None
+        entries = self.sets[page % self.num_sets]
+        frame = entries.get(page)
+        if frame is not None:
+            entries.move_to_end(page)
+        return frame
 
     def insert(self, page, frame):
-        # remove if already exists
-        self.entries = [(p, f) for (p, f) in self.entries if p != page]
+        entries = self.sets[page % self.num_sets]
+        if page in entries:
+            entries.move_to_end(page)
+        elif len(entries) >= self.ways:
+            # remove the least recently used entry of the set
+            entries.popitem(last=False)
+        entries[page] = frame
 
-        # remove the least recently used entry end of list
-        if len(self.entries) >= self.size:
-            self.entries.pop()
-        self.entries.insert(0, (page, frame))
+    def invalidate(self, page):
+        # shoot down the entry for an unmapped page, returns whether there was one
+        return self.sets[page % self.num_sets].pop(page, None) is not None
 
     def clear(self):
-        self.entries = []
+        self.sets = [OrderedDict() for _ in range(self.num_sets)]
+
 
+class PageEntry:
+    __slots__ = ("frame", "dirty")
+
+    def __init__(self, frame, dirty=False):
+        self.frame = frame
+        self.dirty = dirty
+
+
+# Page tables share one interface: add_mapping, translate (frame or None), lookup
+# (PageEntry or None), set_dirty, is_dirty, remove (returns whether the page was
+# dirty), clear, len() and host_size(), the bytes the table occupies in this process.
+# Array-backed tables key on page & PAGE_MASK, the page within one address space;
+# a system_wide table keeps the ASID too and is shared between address spaces.
 
 class PageTable:
     def __init__(self):
-        self.table = {}  # page: {frame, dirty}
+        self.table = {}  # page: PageEntry
+
+    def __len__(self):
+        return len(self.table)
 
     def add_mapping(self, page, frame):
-        self.table[page] = {
-            "frame": frame,
-            "dirty": False
-        }
+        self.table[page] = PageEntry(frame)
+
+    def translate(self, page):
+        entry = self.table.get(page)
+        return None if entry is None else entry.frame
 
     def lookup(self, page):
         return self.table.get(page, None)
 
     def set_dirty(self, page):
-        if page in self.table:
-            self.table[page]["dirty"] = True
+        entry = self.table.get(page)
+        if entry is not None:
+            entry.dirty = True
+
+    def is_dirty(self, page):
+        entry = self.table.get(page)
+        return entry is not None and entry.dirty
+
+    def remove(self, page):
+        entry = self.table.pop(page, None)
+        return entry is not None and entry.dirty
 
     def clear(self):
         self.table = {}
 
+    def host_size(self):
+        return sys.getsizeof(self.table) + len(self.table) * sys.getsizeof(PageEntry(0))
+
+
+class DensePageTable:
+    # parallel frame / dirty arrays indexed by page number, grown on demand;
+    # for address spaces whose pages are numbered from 0 without large holes
+    def __init__(self, num_pages=0):
+        self.initial_pages = num_pages
+        self.clear()
+
+    def __len__(self):
+        return self.count
+
+    def grow(self, page):
+        size = max(page + 1, 2 * len(self.frames))
+        self.frames.extend(array('q', [-1]) * (size - len(self.frames)))
+        self.dirty.extend(bytes(size - len(self.dirty)))
+
+    def add_mapping(self, page, frame):
+        page &= PAGE_MASK
+        if page >= len(self.frames):
+            self.grow(page)
+        if self.frames[page] < 0:
+            self.count += 1
+        self.frames[page] = frame
+        self.dirty[page] = 0
+
+    def translate(self, page):
+        page &= PAGE_MASK
+        if page < len(self.frames):
+            frame = self.frames[page]
+            if frame >= 0:
+                return frame
+        return None
+
+    def lookup(self, page):
+        frame = self.translate(page)
+        return None if frame is None else PageEntry(frame, self.is_dirty(page))
+
+    def set_dirty(self, page):
+        page &= PAGE_MASK
+        if page < len(self.frames) and self.frames[page] >= 0:
+            self.dirty[page] = 1
+
+    def is_dirty(self, page):
+        page &= PAGE_MASK
+        return page < len(self.dirty) and self.dirty[page] == 1
+
+    def remove(self, page):
+        page &= PAGE_MASK
+        if page >= len(self.frames) or self.frames[page] < 0:
+            return False
+        dirty = self.dirty[page] == 1
+        self.frames[page] = -1
+        self.dirty[page] = 0
+        self.count -= 1
+        return dirty
+
+    def clear(self):
+        self.frames = array('q', [-1]) * self.initial_pages
+        self.dirty = bytearray(self.initial_pages)
+        self.count = 0
+
+    def host_size(self):
+        return len(self.frames) * self.frames.itemsize + len(self.dirty)
+
+
+def fibonacci_hash(key, shift):
+    # top bits of a 64-bit multiplicative hash, 64 - shift bits of slot index
+    return ((key * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> shift
+
+
+class HashedPageTable:
+    # open addressing with linear probing over parallel key / frame / dirty arrays,
+    # 17 bytes per slot; for sparse address spaces. Deletion shifts the following
+    # cluster back, so there are no tombstones.
+    EMPTY = -1
+
+    def __init__(self, capacity=64):
+        self.initial_capacity = capacity
+        self.clear()
+
+    def __len__(self):
+        return self.count
+
+    def allocate(self, capacity):
+        self.keys = array('q', [self.EMPTY]) * capacity
+        self.frames = array('q', [-1]) * capacity
+        self.dirty = bytearray(capacity)
+        self.mask = capacity - 1
+        self.shift = 64 - (capacity.bit_length() - 1)
+
+    def find(self, key):
+        # slot holding key, or -1
+        keys = self.keys
+        mask = self.mask
+        i = fibonacci_hash(key, self.shift)
+        while True:
+            k = keys[i]
+            if k == key:
+                return i
+            if k == self.EMPTY:
+                return -1
+            i = (i + 1) & mask
+
+    def add_mapping(self, page, frame):
+        self.insert(page & PAGE_MASK, frame, 0)
+
+    def insert(self, key, frame, dirty):
+        keys = self.keys
+        mask = self.mask
+        i = fibonacci_hash(key, self.shift)
+        while keys[i] != key and keys[i] != self.EMPTY:
+            i = (i + 1) & mask
+        if keys[i] == self.EMPTY:
+            keys[i] = key
+            self.count += 1
+        self.frames[i] = frame
+        self.dirty[i] = dirty
+        if 3 * self.count >= 2 * len(keys):
+            self.rehash(2 * len(keys))
+
+    def rehash(self, capacity):
+        keys, frames, dirty = self.keys, self.frames, self.dirty
+        self.allocate(capacity)
+        self.count = 0
+        for i, key in enumerate(keys):
+            if key != self.EMPTY:
+                self.insert(key, frames[i], dirty[i])
+
+    def translate(self, page):
+        i = self.find(page & PAGE_MASK)
+        return None if i < 0 else self.frames[i]
+
+    def lookup(self, page):
+        i = self.find(page & PAGE_MASK)
+        return None if i < 0 else PageEntry(self.frames[i], self.dirty[i] == 1)
+
+    def set_dirty(self, page):
+        i = self.find(page & PAGE_MASK)
+        if i >= 0:
+            self.dirty[i] = 1
+
+    def is_dirty(self, page):
+        i = self.find(page & PAGE_MASK)
+        return i >= 0 and self.dirty[i] == 1
+
+    def remove(self, page):
+        i = self.find(page & PAGE_MASK)
+        if i < 0:
+            return False
+        was_dirty = self.dirty[i] == 1
+        keys, frames, dirty = self.keys, self.frames, self.dirty
+        mask = self.mask
+        j = i
+        while True:
+            j = (j + 1) & mask
+            key = keys[j]
+            if key == self.EMPTY:
+                break
+            home = fibonacci_hash(key, self.shift)
+            # move the entry into the hole unless its home lies cyclically in (i, j]
+            if (i < home <= j) if i < j else (home > i or home <= j):
+                continue
+            keys[i], frames[i], dirty[i] = key, frames[j], dirty[j]
+            i = j
+        keys[i] = self.EMPTY
+        frames[i] = -1
+        dirty[i] = 0
+        self.count -= 1
+        return was_dirty
+
+    def clear(self):
+        self.allocate(self.initial_capacity)
+        self.count = 0
+
+    def host_size(self):
+        return len(self.keys) * (self.keys.itemsize + self.frames.itemsize + 1)
+
+
+class MultiLevelPageTable(HashedPageTable):
+    # Radix page table model, by default x86-64 style: 4 levels of 512 entries cover
+    # a 48-bit virtual address. Translations live in the hashed table; for the model
+    # only the number of valid entries of every allocated node is kept, so a sparse
+    # 48-bit address space costs host memory per mapping, not per modeled node.
+    def __init__(self, levels=4, bits_per_level=9, entry_size=8):
+        self.levels = levels
+        self.bits_per_level = bits_per_level
+        self.entry_size = entry_size
+        self.page_bits = levels * bits_per_level
+        super().__init__()
+
+    def add_mapping(self, page, frame):
+        key = page & PAGE_MASK
+        if key >> self.page_bits:
+            raise ValueError(f"page {key:#x} is outside the {self.page_bits + 12}-bit address space")
+        if self.find(key) < 0:
+            # count the entry in its leaf node, allocating nodes up to the root as needed
+            for nodes in self.nodes:
+                key >>= self.bits_per_level
+                valid = nodes.get(key, 0)
+                nodes[key] = valid + 1
+                if valid:
+                    break
+            self.peak_nodes = max(self.peak_nodes, self.num_nodes())
+        super().add_mapping(page, frame)
+
+    def remove(self, page):
+        key = page & PAGE_MASK
+        if self.find(key) < 0:
+            return False
+        # free nodes that become empty, bottom up
+        for nodes in self.nodes:
+            key >>= self.bits_per_level
+            valid = nodes[key] - 1
+            if valid:
+                nodes[key] = valid
+                break
+            del nodes[key]
+        return super().remove(page)
+
+    def clear(self):
+        super().clear()
+        self.nodes = [{} for _ in range(self.levels - 1)]  # leaf level first: node: valid entries
+        self.peak_nodes = 1
+
+    def num_nodes(self):
+        return 1 + sum(len(nodes) for nodes in self.nodes)
+
+    def modeled_size(self, peak=False):
+        nodes = self.peak_nodes if peak else self.num_nodes()
+        return nodes * (1 << self.bits_per_level) * self.entry_size
+
+
+class InvertedPageTable:
+    # One entry per physical frame, found through a hash anchor table whose chains run
+    # through the frame entries, so the table scales with physical memory rather than
+    # with the address space. Entries hold the ASID next to the page, as the table is
+    # system-wide: MultiProcessMemory shares one between all processes (one per
+    # partition under local replacement). add_mapping takes over the frame from any
+    # stale page.
+    system_wide = True
+
+    def __init__(self, num_frames, entry_size=16, anchor_size=4):
+        self.num_frames = num_frames
+        self.entry_size = entry_size
+        self.anchor_size = anchor_size
+        self.num_anchors = 1 << max(num_frames - 1, 1).bit_length()
+        self.shift = 64 - (self.num_anchors.bit_length() - 1)
+        self.clear()
+
+    def __len__(self):
+        return self.count
+
+    def partition(self, num_frames):
+        # an empty table of the same layout over num_frames frames
+        return InvertedPageTable(num_frames, self.entry_size, self.anchor_size)
+
+    def find(self, page):
+        # frame holding page, or -1
+        key = page & PAGE_MASK
+        asid = page >> ASID_SHIFT
+        pages = self.pages
+        asids = self.asids
+        chain = self.chain
+        frame = self.anchors[fibonacci_hash(page, self.shift)]
+        while frame >= 0 and (pages[frame] != key or asids[frame] != asid):
+            frame = chain[frame]
+        return frame
+
+    def unlink(self, frame):
+        slot = fibonacci_hash((self.asids[frame] << ASID_SHIFT) | self.pages[frame], self.shift)
+        chain = self.chain
+        prev = self.anchors[slot]
+        if prev == frame:
+            self.anchors[slot] = chain[frame]
+        else:
+            while chain[prev] != frame:
+                prev = chain[prev]
+            chain[prev] = chain[frame]
+        self.pages[frame] = -1
+        self.asids[frame] = 0
+        self.chain[frame] = -1
+        self.dirty[frame] = 0
+        self.count -= 1
+
+    def add_mapping(self, page, frame):
+        old = self.find(page)
+        if old >= 0:
+            self.unlink(old)
+        if self.pages[frame] >= 0:
+            self.unlink(frame)
+        slot = fibonacci_hash(page, self.shift)
+        self.pages[frame] = page & PAGE_MASK
+        self.asids[frame] = page >> ASID_SHIFT
+        self.chain[frame] = self.anchors[slot]
+        self.anchors[slot] = frame
+        self.count += 1
+
+    def translate(self, page):
+        frame = self.find(page)
+        return None if frame < 0 else frame
+
+    def lookup(self, page):
+        frame = self.find(page)
+        return None if frame < 0 else PageEntry(frame, self.dirty[frame] == 1)
+
+    def set_dirty(self, page):
+        frame = self.find(page)
+        if frame >= 0:
+            self.dirty[frame] = 1
+
+    def is_dirty(self, page):
+        frame = self.find(page)
+        return frame >= 0 and self.dirty[frame] == 1
+
+    def remove(self, page):
+        frame = self.find(page)
+        if frame < 0:
+            return False
+        dirty = self.dirty[frame] == 1
+        self.unlink(frame)
+        return dirty
+
+    def clear(self):
+        self.pages = array('q', [-1]) * self.num_frames  # frame: page within its address space
+        self.asids = array('q', [0]) * self.num_frames  # frame: pid of the page
+        self.chain = array('q', [-1]) * self.num_frames  # frame: next frame in its hash chain
+        self.dirty = bytearray(self.num_frames)
+        self.anchors = array('q', [-1]) * self.num_anchors  # hash slot: first frame
+        self.count = 0
+
+    def host_size(self):
+        return (len(self.pages) + len(self.asids) + len(self.chain) + len(self.anchors)) * 8 + len(self.dirty)
+
+    def modeled_size(self, peak=False):
+        return self.num_frames * self.entry_size + self.num_anchors * self.anchor_size
+
+
+class Frames(list):
+    # physical frames (page or None) with a free-frame stack and a page -> frame index
+    def __init__(self, num_frames):
+        super().__init__([None] * num_frames)
+        self.free = list(range(num_frames - 1, -1, -1))  # lowest index on top
+        self.where = {}  # resident page: frame index
+        self.referenced = bytearray(num_frames)  # reference bits, set by VirtualMemory.access
+        self.modified = bytearray(num_frames)  # dirty bits, set by VirtualMemory.access
+
+    def __setitem__(self, idx, page):
+        old_page = list.__getitem__(self, idx)
+        if old_page is not None and self.where.get(old_page) == idx:
+            del self.where[old_page]
+        list.__setitem__(self, idx, page)
+        self.referenced[idx] = 0
+        self.modified[idx] = 0
+        if page is None:
+            self.free.append(idx)
+        else:
+            self.where[page] = idx
+
+    def __contains__(self, page):
+        return page in self.where
+
+    def index(self, page):
+        try:
+            return self.where[page]
+        except KeyError:
+            raise ValueError(f"page {page} is not resident") from None
+
+    def take_free(self):
+        free = self.free
+        while free:
+            idx = free.pop()
+            if list.__getitem__(self, idx) is None:
+                return idx
+        return -1
+
 
 class BaseAlgorithm:
+    variable = False  # True for policies that size the resident set themselves (VariableMemory)
+    released = ()  # pages a variable policy released, unmapped by VariableMemory
+
     def hit(self, frames, page): 
         pass
 
     def miss(self, frames, page): 
         pass
 
+    def repeat(self, frames, page, count):
+        # count further hits on the page just accessed
+        pass
+
     def empty_slot(self, frames):
-        for i in range(len(frames)):
-            if frames[i] is None:
-                return i
-        return -1
+        return frames.take_free()
 
     def reset(self):
         pass
@@ -90,99 +532,622 @@ class FIFO(BaseAlgorithm):
 
 class LRU(BaseAlgorithm):
     def __init__(self, num_frames):
-        self.stack = []
+        self.stack = OrderedDict()  # page: frame index, least recently used first
         self.size = num_frames
 
     def hit(self, frames, page):
         if page in self.stack:
-            self.stack.remove(page)
-        self.stack.insert(0, page)
+            self.stack.move_to_end(page)
 
     def miss(self, frames, page):
         i = self.empty_slot(frames)
 
         if i != -1:
             frames[i] = page
-            self.stack.insert(0, page)
+            self.stack[page] = i
             return None, i
         else:
-            old_page = None
-            for candidate in reversed(self.stack):
-                if candidate in frames:
-                    old_page = candidate
-                    break
-            
-            if old_page is None:
-                old_page = frames[0]
-                self.stack = [p for p in frames if p is not None]
-            
-            if old_page in self.stack:
-                self.stack.remove(old_page)
-            
-            old_idx = frames.index(old_page)
-            
+            old_page, old_idx = self.stack.popitem(last=False)
             frames[old_idx] = page
-            self.stack.insert(0, page)
+            self.stack[page] = old_idx
             return old_page, old_idx
 
     def reset(self):
-        self.stack = []
+        self.stack = OrderedDict()
 
 
 class Optimal(BaseAlgorithm):
-    def __init__(self, trace):
-        # trace contains (op, logical_address), convert to pages for reference string
-        self.reference_string = [t[1] // PAGE_SIZE for t in trace]
+    NEVER = 1 << 62
+
+    def __init__(self, trace=None, pages=None):
+        # trace is any iterable of (op, logical_address), or pages an iterable of page
+        # numbers, read once front to back.
+        # next_use[i] is the next step referencing the page of step base + i (NEVER if none)
+        if pages is None:
+            pages = (logical_address // PAGE_SIZE for _, logical_address in trace)
+        self.build(pages, 0)
         self.current_step = 0
+        self.next_ref = {}  # resident page: next use
+        self.heap = []  # (-next use, frame index), stale entries are skipped lazily
 
-    def hit(self, frames, page):
+    def build(self, pages, base):
+        # index the steps from base on, pages being the page stream from its start
+        self.next_use = array('q')
+        self.base = base
+        last_seen = {}
+        for i, page in enumerate(islice(pages, base, None)):
+            prev = last_seen.get(page)
+            if prev is not None:
+                self.next_use[prev] = base + i
+            last_seen[page] = i
+            self.next_use.append(self.NEVER)
+
+    def restore_index(self, pages):
+        # after loading a checkpoint, which leaves the index out: rebuild it from the
+        # same page stream for the steps still ahead
+        if self.next_use is None:
+            self.build(pages, self.current_step)
+            self.current_step = 0
+
+    def upcoming(self):
+        step = self.current_step
         self.current_step += 1
+        if step < len(self.next_use):
+            return self.next_use[step]
+        return self.NEVER
+
+    def place(self, frames, page, idx, next_ref):
+        self.next_ref[page] = next_ref
+        heap = self.heap
+        heappush(heap, (-next_ref, idx))
+        if len(heap) > 2 * len(self.next_ref) + 64:
+            self.heap = [(-n, frames.where[p]) for p, n in self.next_ref.items()]
+            heapify(self.heap)
+
+    def hit(self, frames, page):
+        next_ref = self.upcoming()
+        idx = frames.where.get(page)
+        if idx is not None:
+            self.place(frames, page, idx, next_ref)
 
     def miss(self, frames, page):
-        victim_idx = -1
-        farthest_distance = -1
-        
+        next_ref = self.upcoming()
+
         empty = self.empty_slot(frames)
         if empty != -1:
             frames[empty] = page
-            self.current_step += 1
+            self.place(frames, page, empty, next_ref)
             return None, empty
 
-        for i, frame_page in enumerate(frames):
-            try:
-                next_use = self.reference_string.index(frame_page, self.current_step + 1)
-                distance = next_use - self.current_step
-            except ValueError:
-                distance = float('inf')
-            
-            if distance > farthest_distance:
-                farthest_distance = distance
-                victim_idx = i
-                
-                if distance == float('inf'):
-                    break
-        
-        old_page = frames[victim_idx]
+        # farthest next use first, ties (never used again) go to the lowest frame
+        while True:
+            neg_next, victim_idx = heappop(self.heap)
+            old_page = frames[victim_idx]
+            if self.next_ref.get(old_page) == -neg_next:
+                break
+
+        del self.next_ref[old_page]
         frames[victim_idx] = page
-        self.current_step += 1
+        self.place(frames, page, victim_idx, next_ref)
         return old_page, victim_idx
 
     def reset(self):
         self.current_step = 0
+        self.next_ref = {}
+        self.heap = []
+
+    def __getstate__(self):
+        # A started run is saved without its index, which is as long as the trace, and
+        # with its absolute step; restore_index rebuilds the part still ahead. An
+        # unstarted copy (sweep workers) keeps sharing the index.
+        state = self.__dict__.copy()
+        if self.current_step or self.base:
+            state["next_use"] = None
+            state["current_step"] = self.base + self.current_step
+            state["base"] = 0
+        return state
+
+class Clock(BaseAlgorithm):
+    def __init__(self):
+        self.hand = 0
+
+    def miss(self, frames, page):
+        i = self.empty_slot(frames)
+        if i != -1:
+            frames[i] = page
+            return None, i
+
+        # skip (and clear) referenced frames, every bit cleared pays for its own step
+        referenced = frames.referenced
+        n = len(frames)
+        hand = self.hand
+        while referenced[hand]:
+            referenced[hand] = 0
+            hand = (hand + 1) % n
+
+        old_page = frames[hand]
+        frames[hand] = page
+        self.hand = (hand + 1) % n
+        return old_page, hand
+
+    def reset(self):
+        self.hand = 0
+
+
+class SecondChance(BaseAlgorithm):
+    # enhanced second chance: prefer (unreferenced, clean), then (unreferenced, dirty), ...
+    # Frames are kept in three FIFO rings by class instead of being swept by a hand, so
+    # a fault examines a bounded number of frames. Only when every frame is referenced
+    # are the reference bits cleared, each paying for the access that set it. Writes
+    # set dirty bits behind the policy's back, so a frame found dirty at the front of
+    # the clean ring moves to the dirty ring.
+    def __init__(self):
+        self.reset()
+
+    def hit(self, frames, page):
+        idx = frames.where[page]
+        referenced = self.referenced
+        if idx in referenced:
+            referenced.move_to_end(idx)
+        else:
+            self.clean.pop(idx, None)
+            self.dirty.pop(idx, None)
+            referenced[idx] = None
+
+    def miss(self, frames, page):
+        old_page = None
+        i = self.empty_slot(frames)
+        if i == -1:
+            i = self.victim(frames)
+            old_page = frames[i]
+        frames[i] = page
+        self.referenced[i] = None
+        return old_page, i
+
+    def victim(self, frames):
+        clean = self.clean
+        dirty = self.dirty
+        modified = frames.modified
+        while True:
+            while clean:
+                idx, _ = clean.popitem(last=False)
+                if not modified[idx]:
+                    return idx
+                dirty[idx] = None
+            if dirty:
+                return dirty.popitem(last=False)[0]
+            # every frame is referenced: clear the bits, least recently referenced first
+            bits = frames.referenced
+            for idx in self.referenced:
+                bits[idx] = 0
+                if modified[idx]:
+                    dirty[idx] = None
+                else:
+                    clean[idx] = None
+            self.referenced.clear()
+
+    def reset(self):
+        self.clean = OrderedDict()  # unreferenced frames clean when they joined, oldest first
+        self.dirty = OrderedDict()  # unreferenced dirty frames, oldest first
+        self.referenced = OrderedDict()  # referenced frames, least recently referenced first
+
+
+class LFU(BaseAlgorithm):
+    # O(1) LFU: frequency buckets of pages in LRU order, ties evict the least recent
+    def __init__(self):
+        self.freq = {}  # resident page: access count
+        self.buckets = {}  # access count: OrderedDict of pages
+        self.min_freq = 0
+
+    def bump(self, page, count):
+        f = self.freq[page]
+        bucket = self.buckets[f]
+        del bucket[page]
+        if not bucket:
+            del self.buckets[f]
+            if self.min_freq == f:
+                # the next frequency in use is at most f + count, the page's own: look
+                # at no more keys than the count, which the run's accesses pay for
+                if count <= len(self.buckets):
+                    m = f + 1
+                    while m < f + count and m not in self.buckets:
+                        m += 1
+                    self.min_freq = m
+                else:
+                    self.min_freq = min(self.buckets, default=f + count)
+        f += count
+        self.freq[page] = f
+        self.buckets.setdefault(f, OrderedDict())[page] = None
+        if f < self.min_freq:
+            self.min_freq = f
+
+    def hit(self, frames, page):
+        if page in self.freq:
+            self.bump(page, 1)
+
+    def repeat(self, frames, page, count):
+        if page in self.freq:
+            self.bump(page, count)
+
+    def miss(self, frames, page):
+        old_page = None
+        i = self.empty_slot(frames)
+        if i == -1:
+            bucket = self.buckets[self.min_freq]
+            old_page, _ = bucket.popitem(last=False)
+            if not bucket:
+                del self.buckets[self.min_freq]
+            del self.freq[old_page]
+            i = frames.index(old_page)
+
+        frames[i] = page
+        self.freq[page] = 1
+        self.buckets.setdefault(1, OrderedDict())[page] = None
+        self.min_freq = 1
+        return old_page, i
+
+    def reset(self):
+        self.freq = {}
+        self.buckets = {}
+        self.min_freq = 0
+
+
+class ARC(BaseAlgorithm):
+    # Adaptive Replacement Cache (Megiddo & Modha): recency list T1 and frequency list
+    # T2 with ghost lists B1/B2 steering the target size p of T1
+    def __init__(self, num_frames):
+        self.size = num_frames
+        self.reset()
+
+    def reset(self):
+        self.p = 0
+        self.t1 = OrderedDict()  # resident, seen once
+        self.t2 = OrderedDict()  # resident, seen at least twice
+        self.b1 = OrderedDict()  # ghosts evicted from t1
+        self.b2 = OrderedDict()  # ghosts evicted from t2
+
+    def hit(self, frames, page):
+        if page in self.t1:
+            del self.t1[page]
+            self.t2[page] = None
+        elif page in self.t2:
+            self.t2.move_to_end(page)
+
+    def repeat(self, frames, page, count):
+        # a second access promotes the page to t2, any further ones change nothing
+        self.hit(frames, page)
+
+    def replace(self, frames, in_b2):
+        # evict from t1 or t2 according to p, remembering the victim as a ghost
+        t1_len = len(self.t1)
+        if self.t1 and (t1_len > self.p or (in_b2 and t1_len == self.p)):
+            old_page, _ = self.t1.popitem(last=False)
+            self.b1[old_page] = None
+        else:
+            old_page, _ = self.t2.popitem(last=False)
+            self.b2[old_page] = None
+        return old_page
+
+    def miss(self, frames, page):
+        c = self.size
+        old_page = None
+        i = self.empty_slot(frames)
+
+        if page in self.b1:
+            self.p = min(c, self.p + max(len(self.b2) / len(self.b1), 1))
+            del self.b1[page]
+            if i == -1:
+                old_page = self.replace(frames, False)
+            self.t2[page] = None
+        elif page in self.b2:
+            self.p = max(0, self.p - max(len(self.b1) / len(self.b2), 1))
+            del self.b2[page]
+            if i == -1:
+                old_page = self.replace(frames, True)
+            self.t2[page] = None
+        else:
+            l1 = len(self.t1) + len(self.b1)
+            if l1 >= c:
+                if len(self.t1) < c:
+                    self.b1.popitem(last=False)
+                    if i == -1:
+                        old_page = self.replace(frames, False)
+                elif i == -1:
+                    old_page, _ = self.t1.popitem(last=False)
+            else:
+                total = l1 + len(self.t2) + len(self.b2)
+                if total >= 2 * c and self.b2:
+                    self.b2.popitem(last=False)
+                if i == -1:
+                    old_page = self.replace(frames, False)
+            self.t1[page] = None
+
+        if old_page is not None:
+            i = frames.index(old_page)
+        frames[i] = page
+        return old_page, i
+
+
+class TwoQueue(BaseAlgorithm):
+    # full 2Q (Johnson & Shasha): new pages wait in FIFO A1in, pages re-referenced after
+    # leaving it (remembered by the ghost FIFO A1out) are promoted to the LRU list Am
+    def __init__(self, num_frames):
+        self.size = num_frames
+        self.kin = max(1, num_frames // 4)
+        self.kout = max(1, num_frames // 2)
+        self.reset()
+
+    def reset(self):
+        self.a1in = OrderedDict()
+        self.a1out = OrderedDict()
+        self.am = OrderedDict()
+
+    def hit(self, frames, page):
+        if page in self.am:
+            self.am.move_to_end(page)
+
+    def reclaim(self, frames):
+        if len(self.a1in) > self.kin or not self.am:
+            old_page, _ = self.a1in.popitem(last=False)
+            self.a1out[old_page] = None
+            if len(self.a1out) > self.kout:
+                self.a1out.popitem(last=False)
+        else:
+            old_page, _ = self.am.popitem(last=False)
+        return old_page
+
+    def miss(self, frames, page):
+        old_page = None
+        i = self.empty_slot(frames)
+        if i == -1:
+            old_page = self.reclaim(frames)
+            i = frames.index(old_page)
+
+        if page in self.a1out:
+            del self.a1out[page]
+            self.am[page] = None
+        else:
+            self.a1in[page] = None
+        frames[i] = page
+        return old_page, i
+
+
+class WorkingSet:
+    # W(t, tau): distinct pages among the last tau references. Every page's latest
+    # reference time is kept while it is in the window and references expire from a
+    # queue, so each reference costs O(1) amortized instead of a window rescan.
+    def __init__(self, tau):
+        self.tau = tau
+        self.reset()
+
+    def reset(self):
+        self.time = 0
+        self.last = {}  # in-window page: time of its latest reference
+        self.refs = deque()  # (time, page) in reference order
+        self.size = 0
+
+    def reference(self, page, count=1):
+        # count consecutive references to page; returns (page, time it left) for the
+        # pages that left the window, or None
+        self.time += count
+        time = self.time
+        last = self.last
+        if page not in last:
+            self.size += 1
+        last[page] = time
+        refs = self.refs
+        refs.append((time, page))
+        horizon = time - self.tau
+        left = None
+        while refs[0][0] <= horizon:
+            expired, p = refs.popleft()
+            if last[p] == expired:
+                del last[p]
+                self.size -= 1
+                if left is None:
+                    left = []
+                left.append((p, expired + self.tau))
+        return left
+
+
+class WorkingSetPolicy(BaseAlgorithm):
+    # Denning's working set: a page stays resident while it was referenced in the last
+    # tau accesses and is released when it leaves that window. If the working set
+    # outgrows physical memory, the least recently used page is evicted.
+    variable = True
+
+    def __init__(self, tau=1000):
+        self.window = WorkingSet(tau)
+        self.reset()
+
+    def reset(self):
+        self.window.reset()
+        self.recency = OrderedDict()  # resident pages, LRU first
+        self.released = []  # (page, frame idx), drained by VariableMemory
+        self.released_steps = 0  # accesses of the last repeat the released pages stayed for
+
+    def release(self, frames, left):
+        for page, _ in left:
+            # a page evicted while still in the window is no longer resident
+            if page in self.recency:
+                del self.recency[page]
+                idx = frames.where[page]
+                frames[idx] = None
+                self.released.append((page, idx))
+
+    def hit(self, frames, page):
+        self.recency.move_to_end(page)
+        left = self.window.reference(page)
+        if left:
+            self.release(frames, left)
+
+    def repeat(self, frames, page, count):
+        start = self.window.time
+        left = self.window.reference(page, count)
+        self.released_steps = 0
+        if left:
+            # a page leaving at time t was resident for the repeats before t
+            self.released_steps = sum(t - start - 1 for p, t in left if p in self.recency)
+            self.release(frames, left)
+
+    def miss(self, frames, page):
+        left = self.window.reference(page)
+        if left:
+            self.release(frames, left)
+        victim = None
+        idx = self.empty_slot(frames)
+        if idx == -1:
+            victim, _ = self.recency.popitem(last=False)
+            idx = frames.where[victim]
+        frames[idx] = page
+        self.recency[page] = None
+        return victim, idx
+
+
+class PFF(BaseAlgorithm):
+    # Page-fault frequency: a fault less than `threshold` accesses after the previous
+    # one grows the resident set; after a longer interval the pages not referenced
+    # since the previous fault are released first. Resident pages are kept in recency
+    # order, so those pages are exactly a prefix and the release is O(released).
+    variable = True
+
+    def __init__(self, threshold=100):
+        self.threshold = threshold
+        self.reset()
+
+    def reset(self):
+        self.time = 0
+        self.last_fault = 0
+        self.recency = OrderedDict()  # resident page: time of its latest reference, LRU first
+        self.released = []  # (page, frame idx), drained by VariableMemory
+        self.released_steps = 0  # repeats never release pages
+
+    def hit(self, frames, page):
+        self.time += 1
+        self.recency[page] = self.time
+        self.recency.move_to_end(page)
+
+    def repeat(self, frames, page, count):
+        self.time += count
+        self.recency[page] = self.time
+
+    def miss(self, frames, page):
+        self.time += 1
+        recency = self.recency
+        if self.time - self.last_fault >= self.threshold:
+            while recency:
+                p, used = next(iter(recency.items()))
+                if used >= self.last_fault:
+                    break
+                del recency[p]
+                idx = frames.where[p]
+                frames[idx] = None
+                self.released.append((p, idx))
+        self.last_fault = self.time
+
+        victim = None
+        idx = self.empty_slot(frames)
+        if idx == -1:
+            victim, _ = recency.popitem(last=False)
+            idx = frames.where[victim]
+        frames[idx] = page
+        recency[page] = self.time
+        return victim, idx
+
+
+class CostModel:
+    # latencies in nanoseconds
+    def __init__(self, tlb_lookup=1, page_walk=100, memory_access=100, page_in=5_000_000, write_back=5_000_000):
+        self.tlb_lookup = tlb_lookup
+        self.page_walk = page_walk
+        self.memory_access = memory_access
+        self.page_in = page_in
+        self.write_back = write_back
+
+    def elapsed(self, vm):
+        # every access pays a TLB lookup and the memory access itself, TLB misses add a
+        # page-table walk, faults a page-in and dirty victims a write-back. Each of these
+        # has a fixed cost, so summing per access equals pricing the counters.
+        accesses = vm.hits + vm.page_faults
+        return (
+            accesses * (self.tlb_lookup + self.memory_access)
+            + vm.tlb_misses * self.page_walk
+            + vm.page_faults * self.page_in
+            + vm.writebacks * self.write_back
+        )
+
 
 class VirtualMemory:
-    def __init__(self, num_frames, algorithm, tlb_size=4):
+    def __init__(self, num_frames, algorithm, tlb_size=4, tlb_ways=None, cost_model=None, page_table=None):
+        # page_table builds an empty page table, PageTable (a dict) by default
+        self.check_algorithm(algorithm)
         self.num_frames = num_frames
-        self.frames = [None] * num_frames
+        self.frames = Frames(num_frames)
         self.algorithm = algorithm
 
-        self.tlb = TLB(tlb_size)
-        self.page_table = PageTable()
+        self.tlb = TLB(tlb_size, tlb_ways)
+        self.page_table_factory = page_table or PageTable
+        self.page_table = self.page_table_factory()
+        self.cost_model = cost_model or CostModel()
 
         self.tlb_hits = 0
         self.tlb_misses = 0
         self.page_faults = 0
         self.hits = 0
+        self.writebacks = 0
+        self.tlb_invalidations = 0
+        self.sinks = []
+
+    def check_algorithm(self, algorithm):
+        # the pages a variable policy releases are only unmapped by VariableMemory
+        if algorithm.variable and not isinstance(self, VariableMemory):
+            raise ValueError(f"{type(algorithm).__name__} sizes the resident set itself and needs VariableMemory")
+
+    def attach(self, sink):
+        # Route accesses through observed_access while any sink is attached; without
+        # sinks the class's access runs untouched. Callers that cached vm.access must
+        # attach first.
+        self.sinks.append(sink)
+        self.access = self.observed_access
+        self.access_run = self.observed_access_run
+
+    def detach(self, sink):
+        self.sinks.remove(sink)
+        if not self.sinks:
+            del self.access
+            del self.access_run
+
+    def observed_access(self, page, mode="R", *args):
+        # sink.record(code, page, frame, count) for every event of one access
+        counters = self.page_faults, self.writebacks, self.tlb_invalidations
+        result = type(self).access(self, page, mode, *args)
+        self.emit(page, result, counters)
+        return result
+
+    def emit(self, page, result, counters):
+        # events of an access, from its result and the counters before it
+        page_faults, writebacks, invalidations = counters
+        _, old_page, frame_idx, is_tlb_hit = result
+        events = [(TLB_HIT, page)] if is_tlb_hit else [
+            (TLB_MISS, page), (FAULT if self.page_faults != page_faults else PT_HIT, page)
+        ]
+        if old_page is not None:
+            events.append((EVICTION, old_page))
+            if self.tlb_invalidations != invalidations:
+                events.append((TLB_INVALIDATION, old_page))
+            if self.writebacks != writebacks:
+                events.append((WRITEBACK, old_page))
+        for sink in self.sinks:
+            for code, event_page in events:
+                sink.record(code, event_page, frame_idx, 1)
+
+    def observed_access_run(self, page, count, mode="R"):
+        # the first access is observed through self.access, the repeats are TLB hits
+        result = VirtualMemory.access_run(self, page, count, mode)
+        if count > 1:
+            for sink in self.sinks:
+                sink.record(TLB_HIT, page, result[2], count - 1)
+        return result
 
     def access(self, page, mode="R"):
     
@@ -201,10 +1166,9 @@ class VirtualMemory:
             status = "HIT (TLB)"
         else:
             self.tlb_misses += 1
-            entry = self.page_table.lookup(page)
+            frame = self.page_table.translate(page)
 
-            if entry is not None:
-                frame = entry["frame"]
+            if frame is not None:
                 self.hits += 1
                 self.algorithm.hit(self.frames, page)
                 frame_idx = frame
@@ -212,27 +1176,47 @@ class VirtualMemory:
             else:
                 self.page_faults += 1
                 old_page, frame_idx = self.algorithm.miss(self.frames, page)
-                
-                self.page_table.add_mapping(page, frame_idx)
+                if self.algorithm.released:
+                    # unmap pages a variable policy released before their frame is reused
+                    self.release()
 
                 if old_page is not None:
-                    old_entry = self.page_table.lookup(old_page)
-                    if old_entry and old_entry["dirty"]:
-                        pass 
-                    self.page_table.table.pop(old_page, None)
+                    if self.tlb.invalidate(old_page):
+                        self.tlb_invalidations += 1
+                    if self.unmap(old_page):
+                        self.writebacks += 1
                     status = "FAULT (MISS)"
                 else:
                     status = "FAULT (MISS)"
 
+                self.page_table.add_mapping(page, frame_idx)
+
             self.tlb.insert(page, frame_idx)
 
+        self.frames.referenced[frame_idx] = 1
         if mode == "W":
             self.page_table.set_dirty(page)
+            self.frames.modified[frame_idx] = 1
 
         return status, old_page, frame_idx, is_tlb_hit
 
+    def unmap(self, page):
+        # drop an evicted page's mapping, returns whether it was dirty
+        return self.page_table.remove(page)
+
+    def access_run(self, page, count, mode="R"):
+        # count consecutive accesses to one page (mode "W" if any of them writes).
+        # Everything after the first access is a TLB hit that leaves no other state changed
+        result = self.access(page, mode)
+        repeats = count - 1
+        if repeats > 0:
+            self.tlb_hits += repeats
+            self.hits += repeats
+            self.algorithm.repeat(self.frames, page, repeats)
+        return result
+
     def reset(self):
-        self.frames = [None] * self.num_frames
+        self.frames = Frames(self.num_frames)
         self.tlb.clear()
         self.page_table.clear()
         self.algorithm.reset()
@@ -240,6 +1224,240 @@ class VirtualMemory:
         self.tlb_misses = 0
         self.page_faults = 0
         self.hits = 0
+        self.writebacks = 0
+        self.tlb_invalidations = 0
+
+    def elapsed_time(self):
+        return self.cost_model.elapsed(self)
+
+    def effective_access_time(self):
+        accesses = self.hits + self.page_faults
+        return self.elapsed_time() / accesses if accesses else 0.0
+
+    def io_bytes(self):
+        # (paged in, written back)
+        return self.page_faults * PAGE_SIZE, self.writebacks * PAGE_SIZE
+
+
+class VariableMemory(VirtualMemory):
+    # Physical memory of num_frames for a variable-allocation policy (algorithm.variable),
+    # which releases pages on its own; those are unmapped like evictions. Tracks the
+    # resident set size per access for its average and peak.
+    def __init__(self, num_frames, algorithm, tlb_size=4, tlb_ways=None, cost_model=None, page_table=None):
+        super().__init__(num_frames, algorithm, tlb_size, tlb_ways, cost_model, page_table)
+        self.reset_allocation()
+
+    def reset_allocation(self):
+        self.frame_accesses = 0  # resident frames summed over accesses
+        self.peak_frames = 0
+        self.releases = 0
+
+    def release(self):
+        released = self.algorithm.released
+        for page, idx in released:
+            self.releases += 1
+            invalidated = self.tlb.invalidate(page)
+            if invalidated:
+                self.tlb_invalidations += 1
+            dirty = self.unmap(page)
+            if dirty:
+                self.writebacks += 1
+            for sink in self.sinks:
+                sink.record(EVICTION, page, idx, 1)
+                if invalidated:
+                    sink.record(TLB_INVALIDATION, page, idx, 1)
+                if dirty:
+                    sink.record(WRITEBACK, page, idx, 1)
+        released.clear()
+
+    def track(self, count):
+        resident = len(self.frames.where)
+        self.frame_accesses += resident * count
+        if resident > self.peak_frames:
+            self.peak_frames = resident
+
+    def access(self, page, mode="R"):
+        result = VirtualMemory.access(self, page, mode)
+        if self.algorithm.released:
+            self.release()
+        self.track(1)
+        return result
+
+    def observed_access(self, page, mode="R"):
+        # pages released by a fault are reported before it, those released by a hit
+        # after the hit
+        counters = self.page_faults, self.writebacks, self.tlb_invalidations
+        result = VirtualMemory.access(self, page, mode)
+        self.emit(page, result, counters)
+        self.release()
+        self.track(1)
+        return result
+
+    def access_run(self, page, count, mode="R"):
+        result = VirtualMemory.access_run(self, page, count, mode)
+        if count > 1:
+            self.release()
+            self.track(count - 1)
+            self.frame_accesses += self.algorithm.released_steps
+        return result
+
+    def observed_access_run(self, page, count, mode="R"):
+        result = VariableMemory.access_run(self, page, count, mode)
+        if count > 1:
+            for sink in self.sinks:
+                sink.record(TLB_HIT, page, result[2], count - 1)
+        return result
+
+    def average_frames(self):
+        accesses = self.hits + self.page_faults
+        return self.frame_accesses / accesses if accesses else 0.0
+
+    def reset(self):
+        super().reset()
+        self.reset_allocation()
+
+
+class ProcessStats:
+    def __init__(self, cost_model):
+        self.cost_model = cost_model
+        self.tlb_hits = 0
+        self.tlb_misses = 0
+        self.page_faults = 0
+        self.hits = 0
+        self.writebacks = 0
+        self.tlb_invalidations = 0
+        self.evicted = 0  # own pages evicted
+        self.stolen = 0  # own pages evicted by another process's fault
+
+    def elapsed_time(self):
+        return self.cost_model.elapsed(self)
+
+    def effective_access_time(self):
+        accesses = self.hits + self.page_faults
+        return self.elapsed_time() / accesses if accesses else 0.0
+
+    def io_bytes(self):
+        return self.page_faults * PAGE_SIZE, self.writebacks * PAGE_SIZE
+
+
+class MultiProcessMemory(VirtualMemory):
+    # Several address spaces sharing physical memory and an ASID-tagged TLB.
+    # algorithm_factory(num_frames, pid) builds a replacement algorithm: one over all
+    # frames (pid None) for "global" replacement, or one per process over its quota
+    # of frames for "local" replacement.
+    def __init__(self, num_frames, algorithm_factory, tlb_size=4, tlb_ways=None, cost_model=None,
+                 replacement="global", quotas=None, flush_on_switch=False, page_table=None):
+        if replacement not in ("global", "local"):
+            raise ValueError(f"Unknown replacement scope: {replacement}")
+        if replacement == "local":
+            if not quotas:
+                raise ValueError("Local replacement needs per-process frame quotas")
+            if sum(quotas.values()) > num_frames or min(quotas.values()) < 1:
+                raise ValueError("Frame quotas must be at least 1 and fit in physical memory")
+
+        self.algorithm_factory = algorithm_factory
+        self.replacement = replacement
+        self.quotas = quotas
+        self.flush_on_switch = flush_on_switch
+        super().__init__(num_frames, self.global_algorithm(num_frames), tlb_size, tlb_ways, cost_model, page_table)
+        # the one table of the machine when its kind is system-wide, else None
+        self.shared_table = self.page_table if getattr(self.page_table, "system_wide", False) else None
+        self.reset_processes()
+
+    def global_algorithm(self, num_frames):
+        # local replacement swaps in each process's own algorithm on every switch
+        if self.replacement == "global":
+            return self.algorithm_factory(num_frames, None)
+        return BaseAlgorithm()
+
+    def reset_processes(self):
+        self.page_tables = {}  # pid: PageTable
+        self.processes = {}  # pid: ProcessStats
+        self.partitions = {}  # pid: (Frames, algorithm, first frame), local replacement only
+        self.current_pid = None
+        self.evicted_page = None  # ASID-tagged page of the latest eviction
+        self.context_switches = 0
+        if self.replacement == "local":
+            base = 0
+            for pid, quota in sorted(self.quotas.items()):
+                algorithm = self.algorithm_factory(quota, pid)
+                self.check_algorithm(algorithm)
+                self.partitions[pid] = (Frames(quota), algorithm, base)
+                base += quota
+
+    def switch_to(self, pid):
+        if self.current_pid is not None:
+            self.context_switches += 1
+            if self.flush_on_switch:
+                self.tlb.clear()
+        self.current_pid = pid
+        if self.replacement == "local" and pid not in self.partitions:
+            raise ValueError(f"No frame quota for process {pid}")
+        if pid not in self.page_tables:
+            self.page_tables[pid] = self.process_page_table(pid)
+            self.processes[pid] = ProcessStats(self.cost_model)
+        self.page_table = self.page_tables[pid]
+        if self.replacement == "local":
+            self.frames, self.algorithm, _ = self.partitions[pid]
+
+    def process_page_table(self, pid):
+        # a system-wide table covers all frames, or the frames of one partition
+        if self.shared_table is None:
+            return self.page_table_factory()
+        if self.replacement == "local":
+            return self.shared_table.partition(self.quotas[pid])
+        return self.shared_table
+
+    def access(self, page, mode="R", pid=0):
+        if pid != self.current_pid:
+            self.switch_to(pid)
+        stats = self.processes[pid]
+        writebacks = self.writebacks
+        tlb_invalidations = self.tlb_invalidations
+
+        status, old_page, frame_idx, is_tlb_hit = VirtualMemory.access(self, (pid << ASID_SHIFT) | page, mode)
+
+        if is_tlb_hit:
+            stats.tlb_hits += 1
+            stats.hits += 1
+        else:
+            stats.tlb_misses += 1
+            if status.startswith("FAULT"):
+                stats.page_faults += 1
+            else:
+                stats.hits += 1
+        if old_page is not None:
+            # the faulting process waits for the write-back, the owner loses the page
+            stats.writebacks += self.writebacks - writebacks
+            stats.tlb_invalidations += self.tlb_invalidations - tlb_invalidations
+            self.evicted_page = old_page
+            owner = self.processes[old_page >> ASID_SHIFT]
+            owner.evicted += 1
+            if owner is not stats:
+                owner.stolen += 1
+            old_page &= PAGE_MASK
+        if self.replacement == "local":
+            frame_idx += self.partitions[pid][2]
+        return status, old_page, frame_idx, is_tlb_hit
+
+    def observed_access(self, page, mode="R", pid=0):
+        # sinks see ASID-tagged pages, (pid << ASID_SHIFT) | page, so the same page
+        # number in two processes stays two pages
+        counters = self.page_faults, self.writebacks, self.tlb_invalidations
+        result = MultiProcessMemory.access(self, page, mode, pid)
+        status, old_page, frame_idx, is_tlb_hit = result
+        if old_page is not None:
+            old_page = self.evicted_page
+        self.emit((pid << ASID_SHIFT) | page, (status, old_page, frame_idx, is_tlb_hit), counters)
+        return result
+
+    def unmap(self, page):
+        return self.page_tables[page >> ASID_SHIFT].remove(page)
+
+    def reset(self):
+        self.algorithm = self.global_algorithm(self.num_frames)
+        super().reset()
+        self.reset_processes()
 
 
 def translation(logical_address, frame_index):
@@ -247,29 +1465,69 @@ def translation(logical_address, frame_index):
     return frame_index * PAGE_SIZE + offset
 
 
-def read_trace_file(filename):
-    trace = []
-    try:
-        with open(filename, "r") as file:
-            for line in file:
-                line = line.strip()
-                if not line or line.startswith('#'):
+def open_trace(filename):
+    # text-mode handle, transparently decompressing .gz / .xz / .bz2 traces
+    if filename.endswith(".gz"):
+        return gzip.open(filename, "rt")
+    elif filename.endswith(".xz"):
+        return lzma.open(filename, "rt")
+    elif filename.endswith(".bz2"):
+        return bz2.open(filename, "rt")
+    return open(filename, "r")
+
+
+def iter_trace(filename, with_pid=False):
+    # lazily yields (op, logical_address) without holding the trace in memory.
+    # With with_pid, yields (op, logical_address, pid) from an optional third column (default 0)
+    with open_trace(filename) as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+
+            parts = line.split()
+            if len(parts) >= 2:
+                op, addr = parts[0], parts[1]
+                try:
+                    addr = int(addr)
+                    if with_pid:
+                        pid = int(parts[2]) if len(parts) >= 3 else 0
+                        yield (op.upper(), addr, pid)
+                    else:
+                        yield (op.upper(), addr)
+                except ValueError:
+                    continue
+            elif len(parts) == 1:
+                try:
+                    val = int(parts[0])
+                    yield ("R", val, 0) if with_pid else ("R", val)
+                except ValueError:
                     continue
 
-                parts = line.split()
-                if len(parts) >= 2:
-                    op, addr = parts[0], parts[1]
-                    try:
-                        addr = int(addr)
-                        trace.append((op.upper(), addr))
-                    except ValueError:
-                        continue
-                elif len(parts) == 1:
-                    try:
-                        val = int(parts[0])
-                        trace.append(("R", val))
-                    except ValueError:
-                        continue
+
+def iter_trace_chunks(filename, chunk_size=65536):
+    chunk = []
+    for access in iter_trace(filename):
+        chunk.append(access)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class TraceFile:
+    # re-iterable text trace, every pass streams the file again
+    def __init__(self, filename, with_pid=False):
+        self.filename = filename
+        self.with_pid = with_pid
+
+    def __iter__(self):
+        return iter_trace(self.filename, self.with_pid)
+
+
+def read_trace_file(filename):
+    try:
+        return list(iter_trace(filename))
     except FileNotFoundError:
         return []
-    return trace
\ No newline at end of file
@@ -0,0 +1,509 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from functools import partial
+from itertools import islice
+
+from bintrace import BinaryTrace, is_binary_trace
+from checkpoint import load_checkpoint, save_checkpoint
+from instrument import EventCounters, EventRecorder
+from metrics import WindowMetrics, write_rows
+from classes import (
+    TLB, VirtualMemory, VariableMemory, MultiProcessMemory, CostModel,
+    FIFO, LRU, Optimal, Clock, SecondChance, LFU, ARC, TwoQueue, WorkingSetPolicy, PFF,
+    PageTable, DensePageTable, HashedPageTable, MultiLevelPageTable, InvertedPageTable,
+    TraceFile, PAGE_SIZE, ASID_SHIFT,
+)
+
+ALGORITHMS = ["FIFO", "LRU", "Optimal", "Clock", "SecondChance", "LFU", "ARC", "2Q", "WS", "PFF"]
+PAGE_TABLES = ["dict", "dense", "hashed", "multilevel", "inverted"]
+
+
+def make_algorithm(name, num_frames, trace=None, pages=None, tau=1000, pff_threshold=100):
+    if name == "FIFO":
+        return FIFO()
+    elif name == "LRU":
+        return LRU(num_frames)
+    elif name == "Optimal":
+        return Optimal(trace, pages)
+    elif name == "Clock":
+        return Clock()
+    elif name == "SecondChance":
+        return SecondChance()
+    elif name == "LFU":
+        return LFU()
+    elif name == "ARC":
+        return ARC(num_frames)
+    elif name == "2Q":
+        return TwoQueue(num_frames)
+    elif name == "WS":
+        return WorkingSetPolicy(tau)
+    elif name == "PFF":
+        return PFF(pff_threshold)
+    raise ValueError(f"Unknown algorithm: {name}")
+
+
+def make_memory(algorithm, frames, **options):
+    # variable-allocation policies run in a VariableMemory, which unmaps the pages they release
+    if algorithm.variable:
+        return VariableMemory(frames, algorithm, **options)
+    return VirtualMemory(frames, algorithm, **options)
+
+
+def make_page_table(name, num_frames):
+    # returns a factory for empty page tables of the given kind
+    if name == "dict":
+        return PageTable
+    elif name == "dense":
+        return DensePageTable
+    elif name == "hashed":
+        return HashedPageTable
+    elif name == "multilevel":
+        return MultiLevelPageTable
+    elif name == "inverted":
+        return partial(InvertedPageTable, num_frames)
+    raise ValueError(f"Unknown page table: {name}")
+
+
+def load_trace(filename, with_pid=False):
+    # memory-mapped binary traces are detected by their header, anything else is parsed as text
+    if is_binary_trace(filename):
+        return BinaryTrace(filename, with_pid)
+    return TraceFile(filename, with_pid)
+
+
+def iter_from(trace, start):
+    if not start:
+        return iter(trace)
+    if isinstance(trace, BinaryTrace):
+        return trace.iter_from(start)
+    return islice(trace, start, None)
+
+
+def run_trace(vm, trace, start=0, checkpoint=None, every=0, state=None):
+    # Feeds the trace from access `start` on to vm (a MultiProcessMemory reads pids).
+    # With a checkpoint file, dict(state, vm=vm, offset=...) is saved every `every`
+    # accesses and at the end; resume with the saved vm from the saved offset
+    accesses = iter_from(trace, start)
+    access = vm.access
+    with_pid = isinstance(vm, MultiProcessMemory)
+    offset = start
+    while True:
+        batch = islice(accesses, every) if checkpoint else accesses
+        done = vm.hits + vm.page_faults
+        if with_pid:
+            for op, logical_address, pid in batch:
+                access(logical_address // PAGE_SIZE, op, pid)
+        else:
+            for op, logical_address in batch:
+                access(logical_address // PAGE_SIZE, op)
+        if not checkpoint:
+            return vm
+        count = vm.hits + vm.page_faults - done
+        offset += count
+        save_checkpoint(checkpoint, dict(state or {}, vm=vm, offset=offset))
+        if count < every:
+            return vm
+
+
+def restore_optimal(vm, trace):
+    # checkpoints leave Optimal's next-use index out; rebuild it from the trace
+    if not isinstance(vm, MultiProcessMemory):
+        if isinstance(vm.algorithm, Optimal):
+            vm.algorithm.restore_index(logical_address // PAGE_SIZE for _, logical_address in trace)
+    elif vm.replacement == "global":
+        if isinstance(vm.algorithm, Optimal):
+            vm.algorithm.restore_index(process_pages(trace))
+    else:
+        for pid, (_, algorithm, _) in vm.partitions.items():
+            if isinstance(algorithm, Optimal):
+                algorithm.restore_index(process_pages(trace, pid))
+
+
+def simulate(trace, algorithm, frames, tlb_size=4, tlb_ways=None, cost_model=None, page_table=None, observers=()):
+    # headless run of the whole trace, returns the finished VirtualMemory.
+    # trace may be a one-shot iterator, but then Optimal must be built beforehand;
+    # observers are event sinks attached for the run
+    if isinstance(algorithm, str):
+        algorithm = make_algorithm(algorithm, frames, trace)
+
+    vm = make_memory(
+        algorithm, frames, tlb_size=tlb_size, tlb_ways=tlb_ways, cost_model=cost_model, page_table=page_table
+    )
+    for sink in observers:
+        vm.attach(sink)
+    return run_trace(vm, trace)
+
+
+def simulate_runs(runs, algorithm, frames, tlb_size=4, tlb_ways=None, cost_model=None, chunk_size=65536,
+                  page_table=None, observers=()):
+    # runs is the (pages, counts, dirty) arrays from preprocess.collapse_runs.
+    # Optimal must be built from the collapsed pages, one step per run
+    pages, counts, dirty = runs
+    if isinstance(algorithm, str):
+        algorithm = make_algorithm(algorithm, frames, pages=pages.tolist())
+
+    vm = make_memory(
+        algorithm, frames, tlb_size=tlb_size, tlb_ways=tlb_ways, cost_model=cost_model, page_table=page_table
+    )
+    for sink in observers:
+        vm.attach(sink)
+    access_run = vm.access_run
+    for start in range(0, len(pages), chunk_size):
+        end = start + chunk_size
+        for page, count, is_dirty in zip(pages[start:end].tolist(), counts[start:end].tolist(), dirty[start:end].tolist()):
+            access_run(page, count, "W" if is_dirty else "R")
+    return vm
+
+
+def process_pages(trace, pid=None):
+    # the page stream one algorithm of a MultiProcessMemory sees: the whole trace
+    # (global replacement, pid None) or one process's accesses (local)
+    return (
+        (p << ASID_SHIFT) | (logical_address // PAGE_SIZE)
+        for _, logical_address, p in trace
+        if pid is None or p == pid
+    )
+
+
+def process_algorithm(name, trace, num_frames, pid):
+    # Optimal is built from exactly the page stream it will see
+    if name != "Optimal":
+        return make_algorithm(name, num_frames)
+    return Optimal(pages=process_pages(trace, pid))
+
+
+def process_algorithm_factory(name, trace=None):
+    # algorithm factory for MultiProcessMemory, picklable for checkpoints
+    return partial(process_algorithm, name, trace)
+
+
+def make_processes(trace, algorithm, frames, tlb_size=4, tlb_ways=None, cost_model=None,
+                   replacement="global", quotas=None, flush_on_switch=False, page_table=None, observers=()):
+    # trace yields (op, logical_address, pid); algorithm is a name or a factory
+    factory = process_algorithm_factory(algorithm, trace) if isinstance(algorithm, str) else algorithm
+    vm = MultiProcessMemory(
+        frames, factory, tlb_size=tlb_size, tlb_ways=tlb_ways, cost_model=cost_model,
+        replacement=replacement, quotas=quotas, flush_on_switch=flush_on_switch, page_table=page_table
+    )
+    for sink in observers:
+        vm.attach(sink)
+    return vm
+
+
+def simulate_processes(trace, algorithm, frames, tlb_size=4, tlb_ways=None, cost_model=None,
+                       replacement="global", quotas=None, flush_on_switch=False, page_table=None, observers=()):
+    vm = make_processes(
+        trace, algorithm, frames, tlb_size, tlb_ways, cost_model, replacement, quotas, flush_on_switch,
+        page_table, observers
+    )
+    return run_trace(vm, trace)
+
+
+def process_rows(vm, config):
+    # one row for the whole machine, then one per process
+    rows = [dict(pid="all", **config)]
+    rows[0].update(statistics(vm))
+    rows[0]["evicted"] = sum(p.evicted for p in vm.processes.values())
+    rows[0]["stolen"] = sum(p.stolen for p in vm.processes.values())
+    rows[0]["context_switches"] = vm.context_switches
+    for pid, stats in sorted(vm.processes.items()):
+        row = dict(pid=pid, **config)
+        row.update(statistics(stats))
+        row["evicted"] = stats.evicted
+        row["stolen"] = stats.stolen
+        row["context_switches"] = ""
+        rows.append(row)
+    return rows
+
+
+def statistics(vm):
+    total = vm.hits + vm.page_faults
+    tlb_total = vm.tlb_hits + vm.tlb_misses
+    bytes_in, bytes_out = vm.io_bytes()
+    return {
+        "accesses": total,
+        "page_faults": vm.page_faults,
+        "hits": vm.hits,
+        "tlb_hits": vm.tlb_hits,
+        "tlb_misses": vm.tlb_misses,
+        "fault_rate": vm.page_faults / total if total else 0.0,
+        "hit_rate": vm.hits / total if total else 0.0,
+        "tlb_hit_rate": vm.tlb_hits / tlb_total if tlb_total else 0.0,
+        "writebacks": vm.writebacks,
+        "tlb_invalidations": vm.tlb_invalidations,
+        "bytes_paged_in": bytes_in,
+        "bytes_written_back": bytes_out,
+        "elapsed_ns": vm.elapsed_time(),
+        "effective_access_ns": vm.effective_access_time(),
+    }
+
+
+def allocation_statistics(vm):
+    # resident-set size under a variable-allocation policy, blank for fixed allocation
+    if not isinstance(vm, VariableMemory):
+        return {"avg_frames": "", "peak_frames": "", "released_pages": ""}
+    return {
+        "avg_frames": vm.average_frames(),
+        "peak_frames": vm.peak_frames,
+        "released_pages": vm.releases,
+    }
+
+
+def page_table_statistics(tables):
+    # host bytes actually used by the simulator's page tables, and the modeled size of
+    # the hardware structure where the table kind models one; a table shared by
+    # several processes counts once
+    tables = list({id(t): t for t in tables}.values())
+    modeled = [t.modeled_size() for t in tables if hasattr(t, "modeled_size")]
+    return {
+        "page_table_host_bytes": sum(t.host_size() for t in tables),
+        "page_table_modeled_bytes": sum(modeled) if modeled else "",
+    }
+
+
+def write_results(rows, out, fmt="json"):
+    if fmt == "json":
+        json.dump(rows, out, indent=2)
+        out.write("\n")
+    else:
+        writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run a memory trace through the simulator without the GUI.")
+    parser.add_argument("trace", help="binary trace, or text trace (R/W <logical address> per line, optionally .gz/.xz/.bz2)")
+    parser.add_argument("-a", "--algorithm", choices=ALGORITHMS, default="FIFO")
+    parser.add_argument("-f", "--frames", type=int, default=3, help="physical frames (the upper bound for WS and PFF)")
+    parser.add_argument("-t", "--tlb-size", type=int, default=4)
+    parser.add_argument("-w", "--tlb-ways", type=int, default=None, help="TLB associativity (default: fully associative)")
+    parser.add_argument("--ws-tau", type=int, default=1000, help="working-set window of the WS policy, in accesses")
+    parser.add_argument("--pff-threshold", type=int, default=100, help="PFF fault interval below which the resident set grows")
+    parser.add_argument("--page-table", choices=PAGE_TABLES, default="dict",
+                        help="dict, array-backed dense or hashed, 4-level radix (48-bit) or inverted")
+    cost = parser.add_argument_group("cost model (nanoseconds)")
+    cost.add_argument("--tlb-ns", type=float, default=1)
+    cost.add_argument("--walk-ns", type=float, default=100)
+    cost.add_argument("--memory-ns", type=float, default=100)
+    cost.add_argument("--page-in-ns", type=float, default=5_000_000)
+    cost.add_argument("--write-back-ns", type=float, default=5_000_000)
+    procs = parser.add_argument_group("multiple processes (trace lines: R/W <address> <pid>)")
+    procs.add_argument("--processes", action="store_true", help="read the PID column and report per-process statistics")
+    procs.add_argument("--replacement", choices=["global", "local"], default="global")
+    procs.add_argument("--quota", action="append", default=[], metavar="PID=FRAMES",
+                       help="frames reserved for a process under local replacement (default: equal split)")
+    procs.add_argument("--flush-on-switch", action="store_true", help="flush the TLB on context switches (untagged TLB)")
+    events = parser.add_argument_group("instrumentation")
+    events.add_argument("--count-events", action="store_true", help="add per-event counts to the results")
+    events.add_argument("--record-events", metavar="FILE", default=None, help="record every event to a binary file")
+    windows = parser.add_argument_group("windowed metrics")
+    windows.add_argument("--window", type=int, default=None, help="accesses per metrics window")
+    windows.add_argument("--tau", type=int, default=None, help="working-set window in accesses (default: --window)")
+    windows.add_argument("--max-windows", type=int, default=1024, help="windows kept before merging pairs")
+    windows.add_argument("--metrics-out", metavar="FILE", default=None, help="*.csv, or JSON lines otherwise")
+    resume = parser.add_argument_group("checkpoints")
+    resume.add_argument("--checkpoint", metavar="FILE", default=None, help="save the simulation state to FILE")
+    resume.add_argument("--checkpoint-every", type=int, default=1_000_000, metavar="N", help="accesses between checkpoints")
+    resume.add_argument("--resume", action="store_true",
+                        help="continue from --checkpoint if it exists, with the settings saved in it")
+    parser.add_argument("--collapse-runs", action="store_true", help="merge repeated accesses to one page first (needs NumPy)")
+    parser.add_argument("--format", choices=["json", "csv"], default="json")
+    parser.add_argument("-o", "--output", default=None, help="output file (default: stdout)")
+    return parser.parse_args(argv)
+
+
+# options that may differ between a run and its resumption
+RUN_OPTIONS = ("output", "format", "checkpoint", "checkpoint_every", "resume")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    state = None
+    if args.resume:
+        if args.checkpoint is None:
+            print("Error: --resume needs --checkpoint", file=sys.stderr)
+            return 2
+        if os.path.exists(args.checkpoint):
+            try:
+                state = load_checkpoint(args.checkpoint)
+            except (OSError, ValueError, EOFError) as e:
+                print(f"Error: could not load checkpoint {args.checkpoint}: {e}", file=sys.stderr)
+                return 1
+            if os.path.abspath(state["args"]["trace"]) != os.path.abspath(args.trace):
+                print(f"Error: {args.checkpoint} is a run of {state['args']['trace']}", file=sys.stderr)
+                return 2
+            # the simulation continues exactly as it was started
+            for key, value in state["args"].items():
+                if key not in RUN_OPTIONS:
+                    setattr(args, key, value)
+    if args.frames < 1:
+        print("Error: frames must be at least 1", file=sys.stderr)
+        return 2
+    try:
+        TLB(args.tlb_size, args.tlb_ways)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    if args.checkpoint is not None and (args.collapse_runs or args.checkpoint_every < 1):
+        print("Error: checkpoints need --checkpoint-every of at least 1 and no --collapse-runs", file=sys.stderr)
+        return 2
+
+    cost_model = CostModel(args.tlb_ns, args.walk_ns, args.memory_ns, args.page_in_ns, args.write_back_ns)
+    if (args.window is None) != (args.metrics_out is None) or (args.window is not None and args.window < 1):
+        print("Error: --window (at least 1) and --metrics-out go together", file=sys.stderr)
+        return 2
+    if state is not None:
+        counters, recorder, window_metrics = state["sinks"]
+    else:
+        window_metrics = WindowMetrics(args.window, args.tau, args.max_windows) if args.window else None
+        counters = EventCounters() if args.count_events else None
+        try:
+            recorder = EventRecorder(args.record_events) if args.record_events else None
+        except OSError as e:
+            print(f"Error: could not create {args.record_events}: {e}", file=sys.stderr)
+            return 1
+    observers = [sink for sink in (counters, recorder, window_metrics) if sink is not None]
+    # saved with every checkpoint, next to the simulator and the trace offset
+    args.state = {"args": {k: v for k, v in vars(args).items() if k != "state"}, "sinks": (counters, recorder, window_metrics)}
+    try:
+        if args.processes:
+            status = main_processes(args, cost_model, observers, counters, state)
+        else:
+            status = main_single(args, cost_model, observers, counters, state)
+    finally:
+        if recorder is not None:
+            recorder.close()
+
+    if status == 0 and window_metrics is not None:
+        with open(args.metrics_out, "w", newline="") as out:
+            write_rows(window_metrics.rows(), out, "csv" if args.metrics_out.endswith(".csv") else "jsonl")
+    return status
+
+
+def main_single(args, cost_model, observers, counters, state=None):
+    try:
+        # Optimal gets its own pass to build the next-use index, the run makes a second one
+        trace = load_trace(args.trace)
+        page_table = make_page_table(args.page_table, args.frames)
+        if args.collapse_runs:
+            from preprocess import preprocess
+            algorithm = args.algorithm
+            if algorithm != "Optimal":
+                algorithm = make_algorithm(algorithm, args.frames, tau=args.ws_tau, pff_threshold=args.pff_threshold)
+            vm = simulate_runs(
+                preprocess(trace), algorithm, args.frames, args.tlb_size, args.tlb_ways, cost_model,
+                page_table=page_table, observers=observers
+            )
+        else:
+            if state is None:
+                algorithm = make_algorithm(
+                    args.algorithm, args.frames, trace, tau=args.ws_tau, pff_threshold=args.pff_threshold
+                )
+                vm = make_memory(
+                    algorithm, args.frames, tlb_size=args.tlb_size, tlb_ways=args.tlb_ways,
+                    cost_model=cost_model, page_table=page_table
+                )
+                for sink in observers:
+                    vm.attach(sink)
+            else:
+                vm = state["vm"]
+                restore_optimal(vm, trace)
+            run_trace(
+                vm, trace, state["offset"] if state else 0, args.checkpoint, args.checkpoint_every, args.state
+            )
+    except (OSError, ValueError) as e:
+        print(f"Error: could not load trace file {args.trace}: {e}", file=sys.stderr)
+        return 1
+
+    row = {
+        "algorithm": args.algorithm,
+        "frames": args.frames,
+        "tlb_size": args.tlb_size,
+        "tlb_ways": min(args.tlb_ways or args.tlb_size, args.tlb_size),
+        "page_table": args.page_table,
+    }
+    row.update(statistics(vm))
+    row.update(allocation_statistics(vm))
+    row.update(page_table_statistics([vm.page_table]))
+    if counters is not None:
+        row.update(counters.as_dict())
+
+    emit(args, [row])
+    return 0
+
+
+def main_processes(args, cost_model, observers, counters, state=None):
+    if args.collapse_runs:
+        print("Error: --collapse-runs does not support --processes", file=sys.stderr)
+        return 2
+    if args.algorithm in ("WS", "PFF"):
+        print(f"Error: {args.algorithm} does not support --processes", file=sys.stderr)
+        return 2
+
+    try:
+        trace = load_trace(args.trace, with_pid=True)
+        if state is None:
+            quotas = {}
+            for item in args.quota:
+                pid, quota = item.split("=")
+                quotas[int(pid)] = int(quota)
+            if args.replacement == "local" and not quotas:
+                pids = sorted({pid for _, _, pid in trace})
+                quotas = {pid: args.frames // len(pids) for pid in pids}
+            vm = make_processes(
+                trace, args.algorithm, args.frames, args.tlb_size, args.tlb_ways, cost_model,
+                args.replacement, quotas or None, args.flush_on_switch,
+                make_page_table(args.page_table, args.frames), observers
+            )
+        else:
+            vm = state["vm"]
+            restore_optimal(vm, trace)
+        run_trace(vm, trace, state["offset"] if state else 0, args.checkpoint, args.checkpoint_every, args.state)
+    except OSError as e:
+        print(f"Error: could not load trace file {args.trace}: {e}", file=sys.stderr)
+        return 1
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    config = {
+        "algorithm": args.algorithm,
+        "frames": args.frames,
+        "tlb_size": args.tlb_size,
+        "tlb_ways": min(args.tlb_ways or args.tlb_size, args.tlb_size),
+        "replacement": args.replacement,
+        "page_table": args.page_table,
+    }
+    rows = process_rows(vm, config)
+    rows[0].update(page_table_statistics(vm.page_tables.values()))
+    tables = list(vm.page_tables.values())
+    for row in rows[1:]:
+        table = vm.page_tables[row["pid"]]
+        if sum(t is table for t in tables) > 1:
+            # a system-wide table belongs to the machine, not to one process
+            row.update(page_table_host_bytes="", page_table_modeled_bytes="")
+        else:
+            row.update(page_table_statistics([table]))
+    if counters is not None:
+        # events are counted for the whole machine only
+        for row in rows:
+            row.update(dict.fromkeys(counters.as_dict(), ""))
+        rows[0].update(counters.as_dict())
+    emit(args, rows)
+    return 0
+
+
+def emit(args, rows):
+    if args.output:
+        with open(args.output, "w", newline="") as out:
+            write_results(rows, out, args.format)
+    else:
+        write_results(rows, sys.stdout, args.format)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
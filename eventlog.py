@@ -0,0 +1,104 @@
+import tempfile
+from array import array
+
+SPILL_INDEX_EVERY = 256  # one spill-file offset kept per this many lines
+
+
+class EventLog:
+    # Ring buffer of the last `capacity` log lines. With spill=True every line is also
+    # written to a temporary file, so older lines stay reachable by index and search.
+    def __init__(self, capacity=10000, spill=False):
+        self.capacity = capacity
+        self.spill = spill
+        self.ring = [None] * capacity
+        self.count = 0  # lines ever appended
+        self.step_offset = None  # line index - step, fixed by the first step line
+        self.file = tempfile.TemporaryFile() if spill else None
+        self.offsets = array('q')  # spill offset of every SPILL_INDEX_EVERY-th line
+
+    def __len__(self):
+        return self.count
+
+    def start(self):
+        # oldest index still available
+        if self.spill:
+            return 0
+        return max(0, self.count - self.capacity)
+
+    def append(self, text, step=None):
+        # step lines must be appended in step order, one per step
+        index = self.count
+        if step is not None and self.step_offset is None:
+            self.step_offset = index - step
+        self.ring[index % self.capacity] = text
+
+        if self.file is not None:
+            if index % SPILL_INDEX_EVERY == 0:
+                self.offsets.append(self.file.tell())
+            self.file.write(text.encode("utf-8", "replace") + b"\n")
+        self.count += 1
+
+    def get(self, index):
+        if index < 0 or index >= self.count:
+            raise IndexError(index)
+        if index >= self.count - self.capacity:
+            return self.ring[index % self.capacity]
+        if self.file is None:
+            raise IndexError(index)
+
+        # older than the ring: seek to the nearest indexed line and read forward
+        self.file.seek(self.offsets[index // SPILL_INDEX_EVERY])
+        for _ in range(index % SPILL_INDEX_EVERY):
+            self.file.readline()
+        line = self.file.readline()
+        self.file.seek(0, 2)
+        return line.decode("utf-8").rstrip("\n")
+
+    def lines(self, first, end):
+        return [line for _, line in self.iter_lines(first, end)]
+
+    def step_index(self, step):
+        if self.step_offset is None:
+            return None
+        index = step + self.step_offset
+        if self.start() <= index < self.count:
+            return index
+        return None
+
+    def iter_lines(self, first, end):
+        # sequential (index, line) pairs, streaming the spill file for old lines
+        first = max(first, self.start())
+        end = min(end, self.count)
+        ring_start = max(first, self.count - self.capacity)
+        if first < ring_start:
+            self.file.seek(self.offsets[first // SPILL_INDEX_EVERY])
+            for _ in range(first % SPILL_INDEX_EVERY):
+                self.file.readline()
+            for index in range(first, min(ring_start, end)):
+                line = self.file.readline()
+                pos = self.file.tell()
+                self.file.seek(0, 2)
+                yield index, line.decode("utf-8").rstrip("\n")
+                self.file.seek(pos)
+            self.file.seek(0, 2)
+        for index in range(ring_start, end):
+            yield index, self.ring[index % self.capacity]
+
+    def search(self, query, start=0):
+        # first index >= start whose line contains query, wrapping around once
+        first = self.start()
+        start = min(max(start, first), self.count)
+        for first, end in ((start, self.count), (first, start)):
+            for index, line in self.iter_lines(first, end):
+                if query in line:
+                    return index
+        return None
+
+    def clear(self):
+        self.close()
+        self.__init__(self.capacity, self.spill)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -2,7 +2,41 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import threading
 import time
-from classes import VirtualMemory, FIFO, LRU, Optimal, read_trace_file, translation, PAGE_SIZE
+from collections import deque
+from classes import read_trace_file, translation, EVICTION, PAGE_SIZE, VariableMemory
+from engine import ALGORITHMS, make_algorithm, make_memory
+from eventlog import EventLog
+from instrument import EventCallback
+from metrics import RateHistory
+
+REFRESH_MS = 33  # repaint at ~30 Hz from the latest snapshot
+TURBO_BATCH = 4096  # accesses between snapshots in turbo mode
+LOG_CAPACITY = 10000  # log lines kept in memory, older ones live in the spill file
+LOG_BACKLOG = 8192  # log lines the worker may queue ahead of the next repaint
+LOG_ROWS = 6  # visible log rows, the only ones rendered into the Text widget
+MEM_PREVIEW = 16  # frames spelled out in each log line
+TREND_POINTS = 120  # downsampled points in the trend chart
+HEATMAP_THRESHOLD = 32  # above this many frames, memory is drawn as a heatmap
+HEATMAP_SIZE = (560, 160)  # target heatmap area in pixels
+HEAT_LEVELS = 8  # repaints a touched frame takes to fade back to its resident color
+HEAT_EMPTY = "#1a1a2e"
+HEAT_CLEAN = "#4a4a6a"
+HEAT_DIRTY = "#b8860b"
+HEAT_HIT = "#98FB98"
+HEAT_FAULT = "#FFB6C1"
+
+
+def blend(color, target, t):
+    a = [int(color[i:i + 2], 16) for i in (1, 3, 5)]
+    b = [int(target[i:i + 2], 16) for i in (1, 3, 5)]
+    return "#" + "".join(f"{round(x + (y - x) * t):02x}" for x, y in zip(a, b))
+
+
+# palette[level], level HEAT_LEVELS - 1 is the freshest touch
+HEAT_PALETTES = {
+    kind: [blend(HEAT_CLEAN, color, (level + 1) / HEAT_LEVELS) for level in range(HEAT_LEVELS)]
+    for kind, color in (("hit", HEAT_HIT), ("fault", HEAT_FAULT))
+}
 
 class VirtualMemorySimulatorGUI:
     def __init__(self, root):
@@ -16,6 +50,8 @@ class VirtualMemorySimulatorGUI:
         self.num_frames = tk.IntVar(value=3)
         self.algorithm_var = tk.StringVar(value="FIFO")
         self.speed_var = tk.DoubleVar(value=0.5)
+        self.delay = 0.5  # copy of speed_var for the worker, set on the Tk thread
+        self.turbo_var = tk.BooleanVar(value=False)
         self.trace_file = tk.StringVar(value="")
         
         # Simulation state
@@ -24,6 +60,28 @@ class VirtualMemorySimulatorGUI:
         self.current_step = 0
         self.is_running = False
         self.simulation_thread = None
+        self.run_id = 0
+        
+        # Worker -> GUI hand-off, repainted by refresh()
+        self.snapshot = None
+        self.painted = None
+        self.worker_done = False
+        self.pending_log = deque(maxlen=LOG_BACKLOG)  # (step, line) waiting for the next repaint
+        self.event_log = EventLog(LOG_CAPACITY, spill=True)
+        self.log_top = 0
+        self.log_follow = True
+        self.log_mark = None
+        self.history = RateHistory(TREND_POINTS, bucket_size=8)
+        self.chart_items = None
+        self.trend_items = None
+        
+        # Heatmap state, touched is filled by the worker (frame index: status)
+        # and swapped out by the GUI, both under touched_lock
+        self.heatmap = None
+        self.touched = {}
+        self.touched_lock = threading.Lock()
+        self.batch_touched = {}  # the worker's dict for the current batch, merged into touched
+        self.heat_fading = {}
         
         # Create GUI
         self.create_gui()
@@ -162,7 +220,7 @@ class VirtualMemorySimulatorGUI:
         algo_combo = ttk.Combobox(
             config_frame,
             textvariable=self.algorithm_var,
-            values=["FIFO", "LRU", "Optimal"],
+            values=ALGORITHMS,
             font=("Arial", 12),
             width=23,
             state="readonly"
@@ -181,11 +239,12 @@ class VirtualMemorySimulatorGUI:
         
         speed_scale = tk.Scale(
             config_frame,
-            from_=0.1,
+            from_=0.0,
             to=2.0,
             resolution=0.1,
             orient=tk.HORIZONTAL,
             variable=self.speed_var,
+            command=self.set_delay,
             bg="#2d2d44",
             fg="white",
             highlightthickness=0,
@@ -194,6 +253,19 @@ class VirtualMemorySimulatorGUI:
         )
         speed_scale.pack(padx=20, pady=5)
         
+        turbo_check = tk.Checkbutton(
+            config_frame,
+            text="Turbo (full speed, progress only)",
+            variable=self.turbo_var,
+            font=("Arial", 10),
+            fg="#CCCCCC",
+            bg="#2d2d44",
+            selectcolor="#1a1a2e",
+            activebackground="#2d2d44",
+            activeforeground="#CCCCCC"
+        )
+        turbo_check.pack(anchor=tk.W, padx=20, pady=5)
+        
         # Buttons
         btn_frame = tk.Frame(config_frame, bg="#2d2d44")
         btn_frame.pack(pady=20, padx=20, fill=tk.X)
@@ -308,6 +380,11 @@ class VirtualMemorySimulatorGUI:
         for widget in self.frames_container.winfo_children():
             widget.destroy()
         self.frame_labels = []
+        self.heatmap = None
+        
+        if num > HEATMAP_THRESHOLD:
+            self.create_heatmap(num)
+            return
         
         for i in range(num):
             frame_box = tk.Frame(
@@ -331,6 +408,70 @@ class VirtualMemorySimulatorGUI:
             label.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
             self.frame_labels.append((frame_box, label))
 
+    def create_heatmap(self, num):
+        # One cell x cell block per frame in a display-size PhotoImage
+        width, height = HEATMAP_SIZE
+        cell = max(1, int((width * height / num) ** 0.5))
+        cols = max(1, width // cell)
+        rows = -(-num // cols)
+        
+        self.heat_cell = cell
+        self.heat_cols = cols
+        self.heat_image = tk.PhotoImage(width=cols * cell, height=rows * cell)
+        self.heat_image.put(HEAT_EMPTY, to=(0, 0, cols * cell, rows * cell))
+        
+        canvas = tk.Canvas(
+            self.frames_container,
+            width=cols * cell,
+            height=rows * cell,
+            bg=HEAT_EMPTY,
+            highlightthickness=0
+        )
+        canvas.pack()
+        self.heatmap = canvas
+        canvas.create_image(0, 0, image=self.heat_image, anchor=tk.NW)
+        with self.touched_lock:
+            self.touched = {}
+        self.heat_fading = {}
+
+    def resident_color(self, idx):
+        page = self.vm.frames[idx]
+        if page is None:
+            return HEAT_EMPTY
+        if self.vm.page_table.is_dirty(page):
+            return HEAT_DIRTY
+        return HEAT_CLEAN
+
+    def update_heatmap(self):
+        # Repaint only frames touched since the last repaint or still fading out
+        with self.touched_lock:
+            touched, self.touched = self.touched, {}
+        fading = self.heat_fading
+        for idx, status in touched.items():
+            if status == "RELEASED":
+                fading[idx] = [-1, None]  # repainted as empty right away
+            else:
+                fading[idx] = [HEAT_LEVELS - 1, HEAT_PALETTES["fault" if status.startswith("FAULT") else "hit"]]
+        if not fading:
+            return
+        
+        cols = self.heat_cols
+        cell = self.heat_cell
+        put = self.heat_image.put
+        settled = []
+        for idx, entry in fading.items():
+            level, palette = entry
+            if level < 0:
+                color = self.resident_color(idx)
+                settled.append(idx)
+            else:
+                color = palette[level]
+                entry[0] = level - 1
+            x, y = idx % cols * cell, idx // cols * cell
+            put(color, to=(x, y, x + cell, y + cell))
+        for idx in settled:
+            del fading[idx]
+
     def create_performance_panel(self, parent):
         perf_frame = tk.Frame(parent, bg="#2d2d44", relief=tk.RAISED, bd=2)
         perf_frame.pack(side=tk.LEFT, fill=tk.Y, padx=10, pady=5)
@@ -358,15 +499,34 @@ class VirtualMemorySimulatorGUI:
         self.chart_canvas = tk.Canvas(
             perf_frame,
             width=200,
-            height=300,
+            height=270,
             bg="#1a1a2e",
             highlightthickness=0
         )
-        self.chart_canvas.pack(pady=20, padx=20)
+        self.chart_canvas.pack(pady=(10, 5), padx=20)
         
         # Draw initial chart
         self.draw_chart(0, 0)
         
+        trend_header = tk.Label(
+            perf_frame,
+            text="Trend (fault rate / TLB hit rate)",
+            font=("Arial", 10),
+            fg="#CCCCCC",
+            bg="#2d2d44"
+        )
+        trend_header.pack()
+        
+        self.trend_canvas = tk.Canvas(
+            perf_frame,
+            width=200,
+            height=100,
+            bg="#1a1a2e",
+            highlightthickness=0
+        )
+        self.trend_canvas.pack(pady=5, padx=20)
+        self.draw_trend()
+        
         # Stats labels
         stats_frame = tk.Frame(perf_frame, bg="#2d2d44")
         stats_frame.pack(pady=10)
@@ -399,64 +559,139 @@ class VirtualMemorySimulatorGUI:
         self.hit_rate_label.pack(pady=10)
 
     def draw_chart(self, hits, faults):
-        self.chart_canvas.delete("all")
-        
         # Chart dimensions
         chart_x = 30
         chart_y = 20
         chart_width = 140
         chart_height = 220
         bar_width = 50
+        faults_x = chart_x + bar_width + 30
+        
+        # Items are created once and then moved in place
+        if self.chart_items is None:
+            canvas = self.chart_canvas
+            self.chart_items = {
+                "hits_bar": canvas.create_rectangle(0, 0, 0, 0, fill="#1a1a2e", outline="#87CEEB", width=2),
+                "hits_text": canvas.create_text(0, 0, fill="#87CEEB", font=("Arial", 12, "bold")),
+                "faults_bar": canvas.create_rectangle(0, 0, 0, 0, fill="#FFB6C1", outline="#FFB6C1", width=2),
+                "faults_text": canvas.create_text(0, 0, fill="#FFB6C1", font=("Arial", 12, "bold")),
+            }
+            canvas.create_text(
+                chart_x + bar_width // 2, chart_y + chart_height + 15,
+                text="Hits", fill="#CCCCCC", font=("Arial", 10)
+            )
+            canvas.create_text(
+                faults_x + bar_width // 2, chart_y + chart_height + 15,
+                text="Faults", fill="#CCCCCC", font=("Arial", 10)
+            )
+        items = self.chart_items
         
         # Max value for scaling
         max_val = max(hits, faults, 1)
         
-        # Draw bars
         # Hits bar
-        hits_height = (hits / max_val) * chart_height if max_val > 0 else 0
-        self.chart_canvas.create_rectangle(
+        hits_height = (hits / max_val) * chart_height
+        self.chart_canvas.coords(
+            items["hits_bar"],
             chart_x, chart_y + chart_height - hits_height,
-            chart_x + bar_width, chart_y + chart_height,
-            fill="#1a1a2e", outline="#87CEEB", width=2
-        )
-        self.chart_canvas.create_text(
-            chart_x + bar_width // 2, chart_y + chart_height - hits_height - 15,
-            text=str(hits), fill="#87CEEB", font=("Arial", 12, "bold")
-        )
-        self.chart_canvas.create_text(
-            chart_x + bar_width // 2, chart_y + chart_height + 15,
-            text="Hits", fill="#CCCCCC", font=("Arial", 10)
+            chart_x + bar_width, chart_y + chart_height
         )
+        self.chart_canvas.coords(items["hits_text"], chart_x + bar_width // 2, chart_y + chart_height - hits_height - 15)
+        self.chart_canvas.itemconfig(items["hits_text"], text=str(hits))
         
         # Faults bar
-        faults_height = (faults / max_val) * chart_height if max_val > 0 else 0
-        faults_x = chart_x + bar_width + 30
-        self.chart_canvas.create_rectangle(
+        faults_height = (faults / max_val) * chart_height
+        self.chart_canvas.coords(
+            items["faults_bar"],
             faults_x, chart_y + chart_height - faults_height,
-            faults_x + bar_width, chart_y + chart_height,
-            fill="#FFB6C1", outline="#FFB6C1", width=2
-        )
-        self.chart_canvas.create_text(
-            faults_x + bar_width // 2, chart_y + chart_height - faults_height - 15,
-            text=str(faults), fill="#FFB6C1", font=("Arial", 12, "bold")
-        )
-        self.chart_canvas.create_text(
-            faults_x + bar_width // 2, chart_y + chart_height + 15,
-            text="Faults", fill="#CCCCCC", font=("Arial", 10)
+            faults_x + bar_width, chart_y + chart_height
         )
+        self.chart_canvas.coords(items["faults_text"], faults_x + bar_width // 2, chart_y + chart_height - faults_height - 15)
+        self.chart_canvas.itemconfig(items["faults_text"], text=str(faults))
+
+    def draw_trend(self):
+        # Two polylines over the downsampled history, a fixed number of canvas items
+        width = 200
+        height = 100
+        pad = 6
+        if self.trend_items is None:
+            canvas = self.trend_canvas
+            canvas.create_line(pad, height - pad, width - pad, height - pad, fill="#4a4a6a")
+            self.trend_items = (
+                canvas.create_line(0, 0, 0, 0, fill="#FFB6C1", width=2),
+                canvas.create_line(0, 0, 0, 0, fill="#87CEEB", width=2),
+            )
+        
+        series = (self.history.fault_rates(), self.history.tlb_hit_rates())
+        for item, rates in zip(self.trend_items, series):
+            if len(rates) < 2:
+                self.trend_canvas.coords(item, 0, 0, 0, 0)
+                continue
+            step = (width - 2 * pad) / (len(rates) - 1)
+            points = []
+            for i, rate in enumerate(rates):
+                points.append(pad + i * step)
+                points.append(height - pad - rate * (height - 2 * pad))
+            self.trend_canvas.coords(item, *points)
 
     def create_trace_log_panel(self):
         log_frame = tk.Frame(self.root, bg="#2d2d44", relief=tk.RAISED, bd=2)
         log_frame.pack(fill=tk.X, padx=20, pady=10)
         
+        log_header_frame = tk.Frame(log_frame, bg="#2d2d44")
+        log_header_frame.pack(fill=tk.X, padx=10, pady=10)
+        
         log_header = tk.Label(
-            log_frame,
+            log_header_frame,
             text="📋 Algorithm Trace Log",
             font=("Arial", 14, "bold"),
             fg="#87CEEB",
             bg="#2d2d44"
         )
-        log_header.pack(anchor=tk.W, padx=10, pady=10)
+        log_header.pack(side=tk.LEFT)
+        
+        # Search / jump, both run against the event log rather than the widget
+        self.step_entry = tk.Entry(
+            log_header_frame,
+            font=("Arial", 10),
+            bg="#1a1a2e",
+            fg="white",
+            insertbackground="white",
+            width=8
+        )
+        self.step_entry.pack(side=tk.RIGHT, padx=(5, 0))
+        self.step_entry.bind("<Return>", lambda e: self.jump_to_step())
+        
+        step_btn = tk.Button(
+            log_header_frame,
+            text="Go to step",
+            font=("Arial", 10),
+            bg="#4a4a6a",
+            fg="white",
+            command=self.jump_to_step
+        )
+        step_btn.pack(side=tk.RIGHT, padx=(15, 0))
+        
+        self.search_entry = tk.Entry(
+            log_header_frame,
+            font=("Arial", 10),
+            bg="#1a1a2e",
+            fg="white",
+            insertbackground="white",
+            width=20
+        )
+        self.search_entry.pack(side=tk.RIGHT, padx=(5, 0))
+        self.search_entry.bind("<Return>", lambda e: self.search_log())
+        
+        search_btn = tk.Button(
+            log_header_frame,
+            text="🔍 Find",
+            font=("Arial", 10),
+            bg="#4a4a6a",
+            fg="white",
+            command=self.search_log
+        )
+        search_btn.pack(side=tk.RIGHT)
         
         log_container = tk.Frame(log_frame, bg="#2d2d44")
         log_container.pack(fill=tk.X, padx=10, pady=(0, 10))
@@ -466,14 +701,19 @@ class VirtualMemorySimulatorGUI:
             font=("Consolas", 10),
             bg="#1a1a2e",
             fg="#98FB98",
-            height=6,
+            height=LOG_ROWS,
+            wrap=tk.NONE,
             state=tk.DISABLED
         )
         self.log_text.pack(side=tk.LEFT, fill=tk.X, expand=True)
-        
-        log_scroll = tk.Scrollbar(log_container, command=self.log_text.yview)
-        log_scroll.pack(side=tk.RIGHT, fill=tk.Y)
-        self.log_text.config(yscrollcommand=log_scroll.set)
+        self.log_text.tag_configure("mark", background="#4a4a6a")
+        
+        # Virtualized: the scrollbar drives which slice of the event log is rendered
+        self.log_scroll = tk.Scrollbar(log_container, command=self.scroll_log)
+        self.log_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.log_text.bind("<MouseWheel>", lambda e: self.scroll_log("scroll", -3 if e.delta > 0 else 3, "units"))
+        self.log_text.bind("<Button-4>", lambda e: self.scroll_log("scroll", -3, "units"))
+        self.log_text.bind("<Button-5>", lambda e: self.scroll_log("scroll", 3, "units"))
 
     def browse_file(self):
         filename = filedialog.askopenfilename(
@@ -490,13 +730,13 @@ class VirtualMemorySimulatorGUI:
             self.trace = read_trace_file(filename)
             if self.trace:
                 display_items = []
-                for t in self.trace:
+                for t in self.trace[:10]:
                     addr = t[1]
                     page = addr // PAGE_SIZE
                     display_items.append(f"{addr}(P{page})")
                 
-                ref_str = " ".join(display_items[:10])
-                if len(display_items) > 10:
+                ref_str = " ".join(display_items)
+                if len(self.trace) > 10:
                     ref_str += " ..."
                 self.ref_string_label.config(text=ref_str, fg="#98FB98")
                 self.log_message(f"Loaded {len(self.trace)} memory references from file (Logical Addresses)")
@@ -505,10 +745,79 @@ class VirtualMemorySimulatorGUI:
                 self.log_message("Error: Could not load trace file")
 
     def log_message(self, message):
+        self.event_log.append(message)
+        self.render_log()
+
+    def clear_log(self):
+        self.event_log.clear()
+        self.log_top = 0
+        self.log_follow = True
+        self.log_mark = None
+        self.render_log()
+
+    def render_log(self):
+        # Only the LOG_ROWS visible lines ever reach the Text widget
+        first = self.event_log.start()
+        end = len(self.event_log)
+        last_top = max(first, end - LOG_ROWS)
+        if self.log_follow:
+            self.log_top = last_top
+        else:
+            self.log_top = min(max(self.log_top, first), last_top)
+        top = self.log_top
+        bottom = min(top + LOG_ROWS, end)
+        
         self.log_text.config(state=tk.NORMAL)
-        self.log_text.insert(tk.END, message + "\n")
-        self.log_text.see(tk.END)
+        self.log_text.delete(1.0, tk.END)
+        self.log_text.insert(tk.END, "\n".join(self.event_log.lines(top, bottom)))
+        if self.log_mark is not None and top <= self.log_mark < bottom:
+            row = self.log_mark - top + 1
+            self.log_text.tag_add("mark", f"{row}.0", f"{row}.end")
         self.log_text.config(state=tk.DISABLED)
+        
+        span = max(end - first, 1)
+        self.log_scroll.set((top - first) / span, (bottom - first) / span)
+
+    def scroll_log(self, action, amount, unit=None):
+        first = self.event_log.start()
+        end = len(self.event_log)
+        if action == "moveto":
+            top = first + int(float(amount) * (end - first))
+        else:
+            top = self.log_top + int(amount) * (LOG_ROWS if unit == "pages" else 1)
+        self.log_top = top
+        self.log_follow = top >= end - LOG_ROWS
+        self.render_log()
+        return "break"
+
+    def show_log_line(self, index):
+        self.log_mark = index
+        self.log_top = index - LOG_ROWS // 2
+        self.log_follow = False
+        self.render_log()
+
+    def search_log(self):
+        query = self.search_entry.get()
+        if not query:
+            return
+        start = self.log_mark + 1 if self.log_mark is not None else self.event_log.start()
+        index = self.event_log.search(query, start)
+        if index is None:
+            messagebox.showinfo("Search", f"'{query}' not found in the trace log")
+        else:
+            self.show_log_line(index)
+
+    def jump_to_step(self):
+        try:
+            step = int(self.step_entry.get())
+        except ValueError:
+            messagebox.showerror("Error", "Step must be a number!")
+            return
+        index = self.event_log.step_index(step - 1)
+        if index is None:
+            messagebox.showinfo("Go to step", f"Step {step} is not in the trace log")
+        else:
+            self.show_log_line(index)
 
     def update_report(self, message):
         self.report_text.config(state=tk.NORMAL)
@@ -517,6 +826,9 @@ class VirtualMemorySimulatorGUI:
         self.report_text.config(state=tk.DISABLED)
 
     def update_frames_display(self, frames, highlight_idx=-1, is_fault=False):
+        if self.heatmap is not None:
+            self.update_heatmap()
+            return
         for i, (box, label) in enumerate(self.frame_labels):
             if frames[i] is not None:
                 label.config(text=str(frames[i]))
@@ -535,6 +847,9 @@ class VirtualMemorySimulatorGUI:
                 box.config(bg="#1a1a2e")
                 label.config(bg="#1a1a2e")
 
+    def set_delay(self, value):
+        self.delay = float(value)
+
     def run_simulation(self):
         if not self.trace:
             messagebox.showerror("Error", "Please load a trace file first!")
@@ -553,15 +868,13 @@ class VirtualMemorySimulatorGUI:
         
         # Create algorithm
         algo_name = self.algorithm_var.get()
-        if algo_name == "FIFO":
-            algorithm = FIFO()
-        elif algo_name == "LRU":
-            algorithm = LRU(num_frames)
-        else: # Optimal
-            algorithm = Optimal(self.trace)
+        algorithm = make_algorithm(algo_name, num_frames, self.trace)
         
         # Create VM
-        self.vm = VirtualMemory(num_frames, algorithm, tlb_size=4)
+        self.vm = make_memory(algorithm, num_frames, tlb_size=4)
+        if self.heatmap is not None and isinstance(self.vm, VariableMemory):
+            # WS and PFF release frames outside the accessed one, reported as evictions
+            self.vm.attach(EventCallback(self.frame_released, (EVICTION,)))
         self.current_step = 0
         self.is_running = True
         
@@ -570,39 +883,123 @@ class VirtualMemorySimulatorGUI:
         self.stop_btn.config(state=tk.NORMAL)
         
         # Clear logs
-        self.log_text.config(state=tk.NORMAL)
-        self.log_text.delete(1.0, tk.END)
-        self.log_text.config(state=tk.DISABLED)
+        self.clear_log()
         
         self.report_text.config(state=tk.NORMAL)
         self.report_text.delete(1.0, tk.END)
         self.report_text.config(state=tk.DISABLED)
         
+        self.history.reset()
+        self.draw_trend()
+        
         self.log_message(f"--- Starting Simulation: {algo_name} ---")
         
-        # Start simulation thread
-        self.simulation_thread = threading.Thread(target=self.simulation_loop)
+        # Start simulation thread, the GUI repaints from its snapshots on a timer
+        self.run_id += 1
+        self.snapshot = None
+        self.painted = None
+        self.worker_done = False
+        self.pending_log.clear()
+        self.delay = self.speed_var.get()
+        self.simulation_thread = threading.Thread(
+            target=self.simulation_loop, args=(self.run_id, self.turbo_var.get())
+        )
         self.simulation_thread.daemon = True
         self.simulation_thread.start()
+        self.root.after(REFRESH_MS, self.refresh, self.run_id)
 
-    def simulation_loop(self):
-        while self.is_running and self.current_step < len(self.trace):
-            op, logical_address = self.trace[self.current_step]
-            page = logical_address // PAGE_SIZE
-            
-            # Access memory
-            status, old_page, frame_idx, is_tlb_hit = self.vm.access(page, op)
-            
-            # Update UI (thread-safe)
-            self.root.after(0, self.update_step, logical_address, page, status, old_page, frame_idx)
-            
-            self.current_step += 1
-            time.sleep(self.speed_var.get())
+    def simulation_loop(self, run_id, turbo):
+        # Worker thread: never touches Tk, only publishes snapshots and log lines
+        vm = self.vm
+        trace = self.trace
+        total = len(trace)
+        watch = self.heatmap is not None  # record touched frames for the heatmap
+        
+        if turbo:
+            access = vm.access
+            while self.is_running and self.run_id == run_id and self.current_step < total:
+                start = self.current_step
+                end = min(start + TURBO_BATCH, total)
+                if watch:
+                    touched = self.batch_touched = {}
+                    for op, logical_address in trace[start:end]:
+                        result = access(logical_address // PAGE_SIZE, op)
+                        touched[result[2]] = result[0]
+                    with self.touched_lock:
+                        self.touched.update(touched)
+                else:
+                    for op, logical_address in trace[start:end]:
+                        result = access(logical_address // PAGE_SIZE, op)
+                self.current_step = end
+                self.snapshot = (end, logical_address, logical_address // PAGE_SIZE) + result[:3]
+        else:
+            while self.is_running and self.run_id == run_id and self.current_step < total:
+                op, logical_address = trace[self.current_step]
+                page = logical_address // PAGE_SIZE
+                
+                # Access memory
+                touched = self.batch_touched = {}
+                status, old_page, frame_idx, is_tlb_hit = vm.access(page, op)
+                if watch:
+                    touched[frame_idx] = status
+                    with self.touched_lock:
+                        self.touched.update(touched)
+                
+                # the log keeps one line per step, so wait for the GUI rather than drop any
+                while len(self.pending_log) == LOG_BACKLOG and self.is_running and self.run_id == run_id:
+                    time.sleep(REFRESH_MS / 1000)
+                self.pending_log.append((self.current_step, self.describe_step(logical_address, page, status, old_page, frame_idx)))
+                self.current_step += 1
+                self.snapshot = (self.current_step, logical_address, page, status, old_page, frame_idx)
+                time.sleep(self.delay)
+        
+        if self.run_id == run_id:
+            self.worker_done = True
+
+    def frame_released(self, code, page, frame, count):
+        # worker thread, from the vm's event sink; a later access to the frame wins
+        self.batch_touched[frame] = "RELEASED"
+
+    def describe_step(self, logical_address, page, status, old_page, frame_idx):
+        phys_addr_str = "?"
+        if frame_idx != -1 and frame_idx is not None:
+            phys_addr_str = str(translation(logical_address, frame_idx))
+        
+        frames = self.vm.frames
+        if len(frames) <= MEM_PREVIEW:
+            mem_str = str([f if f is not None else "-" for f in frames])
+        else:
+            mem_str = f"{len(frames.where)}/{len(frames)} frames in use"
+        log_prefix = f"[{status}] LogAddr: {logical_address} -> PhysAddr: {phys_addr_str}"
         
-        if self.is_running:
-            self.root.after(0, self.simulation_complete)
+        if old_page is not None:
+            return f"{log_prefix} | Replace Page {old_page} with Page {page}. Mem: {mem_str}"
+        return f"{log_prefix} | Insert Page {page}. Mem: {mem_str}"
+
+    def refresh(self, run_id):
+        # Fixed-rate repaint from the latest snapshot, however fast the worker runs
+        if run_id != self.run_id:
+            return
+        done = self.worker_done
+        
+        if self.pending_log:
+            while self.pending_log:
+                step, line = self.pending_log.popleft()
+                self.event_log.append(line, step)
+            self.render_log()
+        
+        snapshot = self.snapshot
+        if snapshot is not None and snapshot is not self.painted:
+            self.painted = snapshot
+            self.update_step(*snapshot)
+        
+        if done:
+            if self.is_running:
+                self.simulation_complete()
+            return
+        self.root.after(REFRESH_MS, self.refresh, run_id)
 
-    def update_step(self, logical_address, page, status, old_page, frame_idx):
+    def update_step(self, step, logical_address, page, status, old_page, frame_idx):
         is_fault = "FAULT" in status
         
         # Update status label
@@ -611,23 +1008,16 @@ class VirtualMemorySimulatorGUI:
              phys_addr = translation(logical_address, frame_idx)
              phys_addr_str = str(phys_addr)
         
-        self.status_label.config(text=f"Log Addr: {logical_address} (Page {page}) | Phys Addr: {phys_addr_str} | Status: {status}")
+        progress = f"Step {step}/{len(self.trace)} ({step / len(self.trace) * 100:.1f}%)"
+        self.status_label.config(text=f"{progress} | Log Addr: {logical_address} (Page {page}) | Phys Addr: {phys_addr_str} | Status: {status}")
         
         # Update frames display
         self.update_frames_display(self.vm.frames, frame_idx, is_fault)
         
-        # Log message
-        mem_str = str([f if f is not None else "-" for f in self.vm.frames])
-        
-        log_prefix = f"[{status}] LogAddr: {logical_address} -> PhysAddr: {phys_addr_str}"
-        
-        if old_page is not None:
-            self.log_message(f"{log_prefix} | Replace Page {old_page} with Page {page}. Mem: {mem_str}")
-        else:
-            self.log_message(f"{log_prefix} | Insert Page {page}. Mem: {mem_str}")
-        
-        # Update chart
+        # Update charts
         self.draw_chart(self.vm.hits, self.vm.page_faults)
+        self.history.add(self.vm.hits + self.vm.page_faults, self.vm.page_faults, self.vm.tlb_hits)
+        self.draw_trend()
         
         # Update stats
         self.hits_label.config(text=f"Hits: {self.vm.hits}")
@@ -651,6 +1041,11 @@ class VirtualMemorySimulatorGUI:
         self.update_report(f"Hits: {self.vm.hits}")
         self.update_report(f"TLB Hits: {self.vm.tlb_hits}")
         self.update_report(f"TLB Misses: {self.vm.tlb_misses}")
+        self.update_report(f"TLB Invalidations: {self.vm.tlb_invalidations}")
+        if isinstance(self.vm, VariableMemory):
+            self.update_report(f"Average Frames: {self.vm.average_frames():.2f}")
+            self.update_report(f"Peak Frames: {self.vm.peak_frames}")
+            self.update_report(f"Released Pages: {self.vm.releases}")
         
         total = self.vm.hits + self.vm.page_faults
         if total > 0:
@@ -658,15 +1053,23 @@ class VirtualMemorySimulatorGUI:
             hit_rate = (self.vm.hits / total) * 100
             self.update_report(f"Page Fault Rate: {fault_rate:.2f}%")
             self.update_report(f"Hit Rate: {hit_rate:.2f}%")
+        
+        bytes_in, bytes_out = self.vm.io_bytes()
+        self.update_report(f"Dirty Write-backs: {self.vm.writebacks}")
+        self.update_report(f"I/O Volume: {bytes_in // 1024} KiB in, {bytes_out // 1024} KiB out")
+        self.update_report(f"Simulated Time: {self.vm.elapsed_time() / 1e6:.3f} ms")
+        self.update_report(f"Effective Access Time: {self.vm.effective_access_time():.1f} ns")
 
     def stop_simulation(self):
         self.is_running = False
+        self.run_id += 1
         self.run_btn.config(state=tk.NORMAL)
         self.stop_btn.config(state=tk.DISABLED)
         self.log_message("--- Simulation Stopped ---")
 
     def reset_simulation(self):
         self.is_running = False
+        self.run_id += 1
         self.current_step = 0
         
         if self.vm:
@@ -678,16 +1081,18 @@ class VirtualMemorySimulatorGUI:
             label.config(text="")
             box.config(bg="#1a1a2e")
             label.config(bg="#1a1a2e", fg="white")
+        if self.heatmap is not None:
+            self.create_frame_boxes(len(self.vm.frames))
         
         self.draw_chart(0, 0)
+        self.history.reset()
+        self.draw_trend()
         self.hits_label.config(text="Hits: 0")
         self.faults_label.config(text="Faults: 0")
         self.hit_rate_label.config(text="Hit Rate: 0%")
         
         # Clear logs
-        self.log_text.config(state=tk.NORMAL)
-        self.log_text.delete(1.0, tk.END)
-        self.log_text.config(state=tk.DISABLED)
+        self.clear_log()
         
         self.report_text.config(state=tk.NORMAL)
         self.report_text.delete(1.0, tk.END)
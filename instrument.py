@@ -0,0 +1,119 @@
+import struct
+
+from classes import ASID_SHIFT, EVENT_NAMES, PAGE_MASK
+
+# Sinks for VirtualMemory.attach. Each gets record(code, page, frame, count) for every
+# event; codes are the constants TLB_HIT .. TLB_INVALIDATION from classes. Pages of a
+# MultiProcessMemory are ASID-tagged, (pid << ASID_SHIFT) | page.
+
+
+class EventCounters:
+    def __init__(self):
+        self.counts = [0] * len(EVENT_NAMES)
+
+    def record(self, code, page, frame, count):
+        self.counts[code] += count
+
+    def as_dict(self):
+        return {f"events_{name}": n for name, n in zip(EVENT_NAMES, self.counts)}
+
+
+class EventHistogram:
+    # events per region of 2 ** region_bits pages, for the selected event codes; the
+    # regions of different processes never overlap, as pages carry their ASID
+    def __init__(self, codes, region_bits=8):
+        self.codes = frozenset(codes)
+        self.region_bits = region_bits
+        self.bins = {code: {} for code in self.codes}  # code: {region: events}
+
+    def record(self, code, page, frame, count):
+        if code in self.codes:
+            bins = self.bins[code]
+            region = page >> self.region_bits
+            bins[region] = bins.get(region, 0) + count
+
+    def rows(self):
+        # (event name, first page of the region, events), sorted by region
+        return [
+            (EVENT_NAMES[code], region << self.region_bits, n)
+            for code in sorted(self.bins)
+            for region, n in sorted(self.bins[code].items())
+        ]
+
+
+class EventCallback:
+    # forwards the selected codes (all by default) to callback(code, page, frame, count)
+    def __init__(self, callback, codes=None):
+        self.callback = callback
+        self.codes = None if codes is None else frozenset(codes)
+
+    def record(self, code, page, frame, count):
+        if self.codes is None or code in self.codes:
+            self.callback(code, page, frame, count)
+
+
+EVENT_MAGIC = b"VMEVENT\0"
+EVENT_HEADER = struct.Struct("<8sI")
+EVENT_VERSION = 2
+EVENT = struct.Struct("<BIqiI")  # code, pid, page, frame, count
+
+
+class EventRecorder:
+    # appends every event as a 21-byte record to a binary file, buffered in memory
+    def __init__(self, filename, buffer_size=1 << 20):
+        self.filename = filename
+        self.file = open(filename, "wb")
+        self.file.write(EVENT_HEADER.pack(EVENT_MAGIC, EVENT_VERSION))
+        self.buffer = bytearray()
+        self.buffer_size = buffer_size
+        self.pack = EVENT.pack
+
+    def record(self, code, page, frame, count):
+        self.buffer += self.pack(code, page >> ASID_SHIFT, page & PAGE_MASK, frame, count)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        self.file.write(self.buffer)
+        self.buffer = bytearray()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getstate__(self):
+        # pickled as the file and its length; restoring drops anything recorded since
+        self.flush()
+        self.file.flush()
+        return {"filename": self.filename, "position": self.file.tell(), "buffer_size": self.buffer_size}
+
+    def __setstate__(self, state):
+        self.filename = state["filename"]
+        self.file = open(self.filename, "r+b")
+        self.file.truncate(state["position"])
+        self.file.seek(state["position"])
+        self.buffer = bytearray()
+        self.buffer_size = state["buffer_size"]
+        self.pack = EVENT.pack
+
+
+def read_events(filename):
+    # yields (code, page, frame, count) from an EventRecorder file, pages ASID-tagged
+    # as they were recorded
+    with open(filename, "rb") as file:
+        magic, version = EVENT_HEADER.unpack(file.read(EVENT_HEADER.size))
+        if magic != EVENT_MAGIC or version != EVENT_VERSION:
+            raise ValueError(f"{filename} is not a version {EVENT_VERSION} event recording")
+        while True:
+            data = file.read(EVENT.size * 65536)
+            if len(data) < EVENT.size:
+                return
+            for code, pid, page, frame, count in EVENT.iter_unpack(data[:len(data) - len(data) % EVENT.size]):
+                yield code, (pid << ASID_SHIFT) | page, frame, count
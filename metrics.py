@@ -0,0 +1,145 @@
+import csv
+import json
+
+from classes import FAULT, TLB_HIT, TLB_MISS, WRITEBACK, WorkingSet
+
+
+class RateHistory:
+    # Bounded history of windowed rates from cumulative counters. Each point covers at
+    # least bucket_size accesses; when max_points is reached, neighbours are merged in
+    # pairs and bucket_size doubles, so any run length fits in the same memory.
+    def __init__(self, max_points=120, bucket_size=64):
+        self.max_points = max_points
+        self.initial_bucket_size = bucket_size
+        self.reset()
+
+    def reset(self):
+        self.bucket_size = self.initial_bucket_size
+        self.points = []  # [accesses, faults, tlb_hits] per point
+        self.current = [0, 0, 0]
+        self.last = (0, 0, 0)
+
+    def add(self, accesses, faults, tlb_hits):
+        # cumulative counters, sampled at any rate
+        last_accesses, last_faults, last_tlb_hits = self.last
+        self.last = (accesses, faults, tlb_hits)
+        current = self.current
+        current[0] += accesses - last_accesses
+        current[1] += faults - last_faults
+        current[2] += tlb_hits - last_tlb_hits
+
+        if current[0] >= self.bucket_size:
+            self.points.append(current)
+            self.current = [0, 0, 0]
+            if len(self.points) >= self.max_points:
+                self.merge()
+
+    def merge(self):
+        points = self.points
+        merged = []
+        for i in range(0, len(points) - 1, 2):
+            a, b = points[i], points[i + 1]
+            merged.append([a[0] + b[0], a[1] + b[1], a[2] + b[2]])
+        if len(points) % 2:
+            merged.append(points[-1])
+        self.points = merged
+        self.bucket_size *= 2
+
+    def fault_rates(self):
+        return [p[1] / p[0] for p in self.points]
+
+    def tlb_hit_rates(self):
+        return [p[2] / p[0] for p in self.points]
+
+
+class WindowMetrics:
+    # Event sink (VirtualMemory.attach) aggregating windows of `window` accesses: faults,
+    # TLB hits, dirty write-backs and the working set W(t, tau) at the window's end and
+    # its peak within it. Like RateHistory, reaching max_windows merges neighbours in
+    # pairs and doubles the window, so memory stays bounded for any trace length.
+    def __init__(self, window=1000, tau=None, max_windows=1024):
+        self.initial_window = window
+        self.max_windows = max_windows
+        self.working_set = WorkingSet(tau or window)
+        self.reset()
+
+    def reset(self):
+        self.window = self.initial_window
+        self.windows = []  # [start, accesses, faults, tlb_hits, writebacks, ws_end, ws_peak]
+        self.current = [0, 0, 0, 0, 0, 0, 0]
+        self.working_set.reset()
+
+    def record(self, code, page, frame, count):
+        current = self.current
+        if code == TLB_HIT or code == TLB_MISS:
+            working_set = self.working_set
+            # a run of repeats (count > 1) is split at window boundaries
+            while count:
+                if current[1] >= self.window:
+                    # close lazily, so the fault of the access that filled the window stays in it
+                    current = self.close()
+                n = min(count, self.window - current[1])
+                count -= n
+                current[1] += n
+                if code == TLB_HIT:
+                    current[3] += n
+                # repeats only shrink the working set, so its peak is after the first one
+                working_set.reference(page)
+                size = working_set.size
+                if size > current[6]:
+                    current[6] = size
+                if n > 1:
+                    working_set.reference(page, n - 1)
+                    size = working_set.size
+                current[5] = size
+        elif code == FAULT:
+            current[2] += count
+        elif code == WRITEBACK:
+            current[4] += count
+
+    def close(self):
+        self.windows.append(self.current)
+        self.current = [self.working_set.time, 0, 0, 0, 0, 0, 0]
+        if len(self.windows) >= self.max_windows:
+            self.merge()
+        return self.current
+
+    def merge(self):
+        windows = self.windows
+        merged = []
+        for i in range(0, len(windows) - 1, 2):
+            a, b = windows[i], windows[i + 1]
+            merged.append([a[0], a[1] + b[1], a[2] + b[2], a[3] + b[3], a[4] + b[4], b[5], max(a[6], b[6])])
+        if len(windows) % 2:
+            merged.append(windows[-1])
+        self.windows = merged
+        self.window *= 2
+
+    def rows(self):
+        # one dict per window, the unfinished one included
+        windows = self.windows + ([self.current] if self.current[1] else [])
+        return [
+            {
+                "start": start,
+                "end": start + accesses,
+                "accesses": accesses,
+                "faults": faults,
+                "fault_rate": faults / accesses,
+                "tlb_hit_rate": tlb_hits / accesses,
+                "writebacks": writebacks,
+                "working_set": ws_end,
+                "working_set_peak": ws_peak,
+            }
+            for start, accesses, faults, tlb_hits, writebacks, ws_end, ws_peak in windows
+        ]
+
+
+def write_rows(rows, out, fmt="csv"):
+    # CSV, or JSON lines with one object per row
+    if fmt == "jsonl":
+        for row in rows:
+            out.write(json.dumps(row) + "\n")
+    elif rows:
+        writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
@@ -0,0 +1,66 @@
+from itertools import islice
+
+import numpy as np
+
+from bintrace import BinaryTrace, WRITE_BIT
+from classes import PAGE_SIZE
+
+CHUNK_SIZE = 1 << 16
+
+
+def trace_columns(trace, chunk_size=CHUNK_SIZE):
+    # yields (addresses, writes) arrays: binary traces as one view of the mapped words,
+    # text traces chunk_size accesses at a time, so only one chunk is ever held as tuples
+    if isinstance(trace, BinaryTrace):
+        words = trace.as_numpy()
+        yield words & np.uint64(trace.address_mask), (words & np.uint64(WRITE_BIT)) != 0
+        return
+
+    accesses = iter(trace)
+    while True:
+        chunk = list(islice(accesses, chunk_size))
+        if not chunk:
+            return
+        addresses = np.fromiter((address for _, address in chunk), dtype=np.uint64, count=len(chunk))
+        writes = np.fromiter((op == "W" for op, _ in chunk), dtype=bool, count=len(chunk))
+        yield addresses, writes
+
+
+def page_numbers(addresses, page_size=PAGE_SIZE):
+    if page_size & (page_size - 1) == 0:
+        return addresses >> np.uint64(page_size.bit_length() - 1)
+    return addresses // np.uint64(page_size)
+
+
+def collapse_runs(pages, writes):
+    # merge consecutive accesses to the same page into (page, count, dirty) runs;
+    # the repeats are guaranteed TLB hits, so statistics are unchanged
+    if len(pages) == 0:
+        return pages, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool)
+
+    starts = np.flatnonzero(np.concatenate(([True], pages[1:] != pages[:-1])))
+    counts = np.diff(np.append(starts, len(pages)))
+    dirty = np.logical_or.reduceat(writes, starts)
+    return pages[starts], counts, dirty
+
+
+def preprocess(trace, page_size=PAGE_SIZE, collapse=True):
+    # (pages, counts, dirty) for the whole trace, built chunk by chunk; a run that
+    # spans a chunk boundary is merged into one
+    parts = []
+    for addresses, writes in trace_columns(trace):
+        pages = page_numbers(addresses, page_size)
+        if not collapse:
+            parts.append((pages, np.ones(len(pages), dtype=np.int64), writes))
+            continue
+        pages, counts, dirty = collapse_runs(pages, writes)
+        if parts and len(pages) and parts[-1][0][-1] == pages[0]:
+            last_counts, last_dirty = parts[-1][1], parts[-1][2]
+            last_counts[-1] += counts[0]
+            last_dirty[-1] |= dirty[0]
+            pages, counts, dirty = pages[1:], counts[1:], dirty[1:]
+        if len(pages):
+            parts.append((pages, counts, dirty))
+    if not parts:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool)
+    return tuple(np.concatenate(column) for column in zip(*parts))
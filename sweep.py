@@ -0,0 +1,124 @@
+import argparse
+import copy
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+from bintrace import BinaryTrace, convert_text_trace, is_binary_trace
+from classes import Optimal
+from engine import ALGORITHMS, allocation_statistics, make_algorithm, simulate, statistics, write_results
+
+# per-worker state, set up once by init_worker
+_trace = None
+_optimal = None
+
+
+def init_worker(filename):
+    # every worker maps the same binary file, the OS page cache keeps a single copy
+    global _trace, _optimal
+    _trace = BinaryTrace(filename)
+    _optimal = None
+
+
+def worker_algorithm(name, frames):
+    global _optimal
+    if name != "Optimal":
+        return make_algorithm(name, frames)
+    if _optimal is None:
+        _optimal = Optimal(_trace)
+    # share the read-only next-use index, start from fresh bookkeeping
+    algorithm = copy.copy(_optimal)
+    algorithm.reset()
+    return algorithm
+
+
+def run_point(point):
+    name, frames, tlb_size = point
+    start = time.perf_counter()
+    vm = simulate(_trace, worker_algorithm(name, frames), frames, tlb_size)
+    row = {"algorithm": name, "frames": frames, "tlb_size": tlb_size}
+    row.update(statistics(vm))
+    row.update(allocation_statistics(vm))
+    row["seconds"] = time.perf_counter() - start
+    return row
+
+
+def sweep(filename, algorithms, frame_counts, tlb_sizes, workers=None):
+    points = list(product(algorithms, frame_counts, tlb_sizes))
+    with tempfile.TemporaryDirectory() as tmp:
+        if not is_binary_trace(filename):
+            binary = os.path.join(tmp, "trace.vmt")
+            convert_text_trace(filename, binary)
+            filename = binary
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(filename,)) as pool:
+            return list(pool.map(run_point, points))
+
+
+def parse_sizes(text):
+    # "1-512", "4,8,16" or "4-1024x2" (geometric), comma-separated parts may be mixed
+    sizes = []
+    for part in text.split(","):
+        if "-" in part:
+            low, high = part.split("-", 1)
+            factor = None
+            if "x" in high:
+                high, factor = high.split("x", 1)
+            low, high = int(low), int(high)
+            if factor is None:
+                sizes.extend(range(low, high + 1))
+            else:
+                size = low
+                while size <= high:
+                    sizes.append(size)
+                    size *= int(factor)
+        else:
+            sizes.append(int(part))
+    return sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run every algorithm x frames x TLB size combination in parallel.")
+    parser.add_argument("trace")
+    parser.add_argument("-a", "--algorithms", default=",".join(ALGORITHMS))
+    parser.add_argument("-f", "--frames", default="1-64", help='e.g. "1-512", "8,16,32" or "8-4096x2"')
+    parser.add_argument("-t", "--tlb-sizes", default="4")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--format", choices=["json", "csv"], default="csv")
+    parser.add_argument("-o", "--output", default=None)
+    args = parser.parse_args(argv)
+
+    algorithms = args.algorithms.split(",")
+    for name in algorithms:
+        if name not in ALGORITHMS:
+            print(f"Error: unknown algorithm {name}", file=sys.stderr)
+            return 2
+    try:
+        frame_counts = parse_sizes(args.frames)
+        tlb_sizes = parse_sizes(args.tlb_sizes)
+    except ValueError:
+        print("Error: invalid size list", file=sys.stderr)
+        return 2
+    if not frame_counts or min(frame_counts) < 1 or not tlb_sizes or min(tlb_sizes) < 1:
+        print("Error: frame counts and TLB sizes must be at least 1", file=sys.stderr)
+        return 2
+
+    try:
+        rows = sweep(args.trace, algorithms, frame_counts, tlb_sizes, args.workers)
+    except (OSError, ValueError) as e:
+        print(f"Error: could not load trace file {args.trace}: {e}", file=sys.stderr)
+        return 1
+
+    if args.output:
+        with open(args.output, "w", newline="") as out:
+            write_results(rows, out, args.format)
+    else:
+        write_results(rows, sys.stdout, args.format)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
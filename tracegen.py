@@ -0,0 +1,271 @@
+import argparse
+import bz2
+import gzip
+import lzma
+import math
+import sys
+
+import numpy as np
+
+from bintrace import FLAG_PID, HEADER, MAGIC, MAX_PID, PID_ADDRESS_MASK, PID_SHIFT, VERSION, WRITE_BIT
+from classes import PAGE_SIZE
+
+PATTERNS = ["seq", "stride", "loop", "zipf", "uniform"]
+CHUNK_SIZE = 1 << 20
+
+# A workload is a list of phases run one after another, each a dict with
+#   pattern  seq | stride | loop | zipf | uniform
+#   n        accesses in the phase
+#   pages    pages the phase touches, from page `base` on
+#   stride   pages between accesses of a stride scan
+#   loop     pages in a loop's working set
+#   skew     Zipf exponent
+#   writes   fraction of accesses that are writes
+DEFAULTS = {
+    "pattern": "zipf",
+    "n": 1_000_000,
+    "pages": 65536,
+    "base": 0,
+    "stride": 16,
+    "loop": 1024,
+    "skew": 1.0,
+    "writes": 0.25,
+}
+
+
+def parse_phase(text, defaults=DEFAULTS):
+    # "zipf" or "zipf:n=1e6,pages=4096,skew=1.2"
+    pattern, _, options = text.partition(":")
+    phase = dict(defaults, pattern=pattern)
+    if pattern not in PATTERNS:
+        raise ValueError(f"Unknown pattern: {pattern}")
+    for option in filter(None, options.split(",")):
+        key, _, value = option.partition("=")
+        if key not in DEFAULTS or key == "pattern":
+            raise ValueError(f"Unknown phase option: {key}")
+        phase[key] = float(value) if key in ("skew", "writes") else int(float(value))
+    if phase["pages"] < 1 or phase["n"] < 0:
+        raise ValueError("A phase needs at least one page and a non-negative length")
+    return phase
+
+
+def coprime_multiplier(pages):
+    # spreads consecutive Zipf ranks over the phase's pages
+    mult = max(1, int(pages * 0.6180339887)) | 1
+    while math.gcd(mult, pages) != 1:
+        mult += 2
+    return mult
+
+
+def power_integral(a, b, skew):
+    # integral of x ** -skew over [a, b)
+    if skew == 1.0:
+        return math.log(b / a)
+    return (b ** (1 - skew) - a ** (1 - skew)) / (1 - skew)
+
+
+class ZipfSampler:
+    # Zipf ranks over `pages`: exact inverse CDF over the first `head` ranks, where the
+    # distribution is steep, and the inverse of the continuous power law beyond them,
+    # so memory stays O(head) for any number of pages
+    def __init__(self, pages, skew, head=1 << 16):
+        self.pages = pages
+        self.skew = skew
+        self.head = min(head, pages)
+        weights = np.arange(1, self.head + 1, dtype=np.float64) ** -skew
+        self.cdf = np.cumsum(weights)
+        self.a = self.head + 0.5
+        self.b = pages + 0.5
+        tail = power_integral(self.a, self.b, skew) if pages > self.head else 0.0
+        self.head_mass = self.cdf[-1] / (self.cdf[-1] + tail)
+        self.cdf /= self.cdf[-1]
+
+    def sample(self, rng, count):
+        u = rng.random(count)
+        ranks = np.empty(count, dtype=np.int64)
+        in_head = u < self.head_mass
+        ranks[in_head] = np.minimum(np.searchsorted(self.cdf, u[in_head] / self.head_mass, side="right"), self.head - 1)
+        if not in_head.all():
+            v = (u[~in_head] - self.head_mass) / (1 - self.head_mass)
+            a, b, s = self.a, self.b, self.skew
+            if s == 1.0:
+                x = a * np.power(b / a, v)
+            else:
+                x = np.power(a ** (1 - s) + v * (b ** (1 - s) - a ** (1 - s)), 1 / (1 - s))
+            ranks[~in_head] = np.clip(np.rint(x).astype(np.int64) - 1, self.head, self.pages - 1)
+        return ranks
+
+
+class Stream:
+    # the access stream of one process, produced in chunks of any size; each phase
+    # and the write/offset draws have their own generators, so the output does not
+    # depend on the chunk size
+    def __init__(self, phases, seed):
+        self.phases = phases
+        sequence = np.random.SeedSequence(seed)
+        phase_seeds = sequence.spawn(len(phases) + 2)
+        self.rngs = [np.random.default_rng(s) for s in phase_seeds[:len(phases)]]
+        self.write_rng = np.random.default_rng(phase_seeds[-2])
+        self.offset_rng = np.random.default_rng(phase_seeds[-1])
+        self.shifts = [int(rng.integers(phase["pages"])) for rng, phase in zip(self.rngs, phases)]
+        self.samplers = [
+            ZipfSampler(phase["pages"], phase["skew"]) if phase["pattern"] == "zipf" else None
+            for phase in phases
+        ]
+        self.phase = 0
+        self.pos = 0
+
+    def __len__(self):
+        return sum(phase["n"] for phase in self.phases)
+
+    def pages(self, count):
+        phase = self.phases[self.phase]
+        rng = self.rngs[self.phase]
+        pattern = phase["pattern"]
+        pages = phase["pages"]
+        pos = np.arange(self.pos, self.pos + count, dtype=np.int64)
+        if pattern == "seq":
+            page = pos % pages
+        elif pattern == "stride":
+            page = (pos * phase["stride"]) % pages
+        elif pattern == "loop":
+            page = pos % min(phase["loop"], pages)
+        elif pattern == "uniform":
+            page = rng.integers(0, pages, count)
+        else:
+            # the shift moves the hot pages between zipf phases
+            ranks = self.samplers[self.phase].sample(rng, count)
+            page = (ranks * coprime_multiplier(pages) + self.shifts[self.phase]) % pages
+        return page + phase["base"]
+
+    def take(self, count):
+        # (addresses, writes) for the next count accesses, fewer at the end
+        pages = []
+        writes = []
+        while count and self.phase < len(self.phases):
+            phase = self.phases[self.phase]
+            m = min(count, phase["n"] - self.pos)
+            pages.append(self.pages(m))
+            writes.append(self.write_rng.random(m) < phase["writes"])
+            self.pos += m
+            count -= m
+            if self.pos == phase["n"]:
+                self.phase += 1
+                self.pos = 0
+        if not pages:
+            return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=bool)
+        pages = np.concatenate(pages).astype(np.uint64)
+        offsets = self.offset_rng.integers(0, PAGE_SIZE // 8, len(pages), dtype=np.uint64) * np.uint64(8)
+        return pages * np.uint64(PAGE_SIZE) + offsets, np.concatenate(writes)
+
+
+def interleave(columns, quantum):
+    # round-robin, quantum accesses at a time, over equal-length per-process columns
+    processes, length = columns.shape
+    full = length - length % quantum
+    parts = [columns[:, :full].reshape(processes, -1, quantum).transpose(1, 0, 2).ravel()]
+    if full < length:
+        parts.append(columns[:, full:].T.ravel())
+    return np.concatenate(parts)
+
+
+def generate(phases, processes=1, quantum=1000, seed=0, chunk_size=CHUNK_SIZE):
+    # yields (addresses, writes, pids) chunks; every process runs the same phases from
+    # its own seed in its own address space, scheduled round-robin every quantum accesses
+    streams = [Stream(phases, [seed, pid]) for pid in range(processes)]
+    per_process = max(quantum, chunk_size // processes // quantum * quantum)
+    pid_column = np.arange(processes, dtype=np.uint64)[:, None]
+    while True:
+        taken = [stream.take(per_process) for stream in streams]
+        length = len(taken[0][0])
+        if not length:
+            return
+        addresses = interleave(np.stack([a for a, _ in taken]), quantum)
+        writes = interleave(np.stack([w for _, w in taken]), quantum)
+        pids = interleave(np.broadcast_to(pid_column, (processes, length)), quantum)
+        yield addresses, writes, pids
+
+
+def open_output(filename):
+    if filename.endswith(".gz"):
+        return gzip.open(filename, "wt")
+    elif filename.endswith(".xz"):
+        return lzma.open(filename, "wt")
+    elif filename.endswith(".bz2"):
+        return bz2.open(filename, "wt")
+    return open(filename, "w")
+
+
+def write_text(filename, chunks, with_pid=False):
+    # the text trace format, "R/W <address>" or "R/W <address> <pid>" per line
+    count = 0
+    with open_output(filename) as out:
+        for addresses, writes, pids in chunks:
+            ops = np.where(writes, "W", "R")
+            if with_pid:
+                lines = [f"{op} {a} {p}\n" for op, a, p in zip(ops.tolist(), addresses.tolist(), pids.tolist())]
+            else:
+                lines = [f"{op} {a}\n" for op, a in zip(ops.tolist(), addresses.tolist())]
+            out.writelines(lines)
+            count += len(lines)
+    return count
+
+
+def write_binary(filename, chunks, with_pid=False):
+    # the bintrace format, encoded a chunk at a time
+    count = 0
+    with open(filename, "wb") as out:
+        out.write(HEADER.pack(MAGIC, VERSION, FLAG_PID if with_pid else 0))
+        for addresses, writes, pids in chunks:
+            words = addresses.copy()
+            if with_pid:
+                if len(words) and (words.max() > PID_ADDRESS_MASK or pids.max() > MAX_PID):
+                    raise ValueError("addresses must fit 48 bits and pids 15 bits in a binary trace with pids")
+                words |= pids << np.uint64(PID_SHIFT)
+            words[writes] |= np.uint64(WRITE_BIT)
+            out.write(words.astype("<u8").tobytes())
+            count += len(words)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic memory trace with controlled locality.")
+    parser.add_argument("output", help="*.vmt for a binary trace, anything else (optionally .gz/.xz/.bz2) for text")
+    parser.add_argument("-p", "--phase", action="append", default=[], metavar="PATTERN[:KEY=VALUE,...]",
+                        help=f"one phase of {', '.join(PATTERNS)}; repeat for phase changes, "
+                             f"keys: {', '.join(k for k in DEFAULTS if k != 'pattern')}")
+    parser.add_argument("-n", "--accesses", type=float, default=DEFAULTS["n"], help="default accesses per phase and process")
+    parser.add_argument("--pages", type=float, default=DEFAULTS["pages"])
+    parser.add_argument("--skew", type=float, default=DEFAULTS["skew"])
+    parser.add_argument("--write-ratio", type=float, default=DEFAULTS["writes"])
+    parser.add_argument("-P", "--processes", type=int, default=1)
+    parser.add_argument("-q", "--quantum", type=int, default=1000, help="accesses per scheduling slice")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=["text", "binary"], default=None, help="default: by file extension")
+    args = parser.parse_args(argv)
+
+    defaults = dict(DEFAULTS, n=int(args.accesses), pages=int(args.pages), skew=args.skew, writes=args.write_ratio)
+    try:
+        phases = [parse_phase(text, defaults) for text in args.phase or [defaults["pattern"]]]
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    if args.processes < 1 or args.quantum < 1:
+        print("Error: processes and quantum must be at least 1", file=sys.stderr)
+        return 2
+
+    fmt = args.format or ("binary" if args.output.endswith(".vmt") else "text")
+    with_pid = args.processes > 1
+    chunks = generate(phases, args.processes, args.quantum, args.seed)
+    try:
+        writer = write_binary if fmt == "binary" else write_text
+        count = writer(args.output, chunks, with_pid)
+    except (OSError, ValueError) as e:
+        print(f"Error: could not write {args.output}: {e}", file=sys.stderr)
+        return 1
+    print(f"Wrote {count} accesses to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())